@@ -0,0 +1,372 @@
+"""
+Report query plans and latencies of the lookup queries with and without their indexes.
+
+Usage:
+    python -m benchmarks.index_plans [--users 50000] [--books 200000] [--reviews 1000000]
+        [--tags 2000] [--repeat 50] [--plans] [--skip-seed] [--cleanup]
+
+Seeds users, books, reviews and tags server-side into the database configured
+in .env (marked so --cleanup can remove them), runs the service methods that
+look rows up by email, user, book and tag name, and records the SELECTs they
+issue. Each statement is then run under EXPLAIN ANALYZE and timed twice: as is,
+and inside a transaction that drops the lookup indexes and is rolled back.
+
+Dropping an index locks its table until the rollback, so only point this at a
+benchmark database.
+"""
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import event, text
+
+from benchmarks.utils import percentile
+from src.auth.service import UserService
+from src.books.service import BookService
+from src.db.postgres import SessionFactory, async_engine, init_db
+from src.tags.service import TagService
+
+BENCH_DOMAIN = "@bench.bookly.dev"
+BENCH_PUBLISHER = "Bookly Index Bench"
+BENCH_TAG_PREFIX = "bench-"
+SEED_BATCH = 100000
+TAGS_PER_BOOK = 3
+
+# Indexes added for the lookups below; dropped for the "before" run
+LOOKUP_INDEXES = (
+    "ix_users_email",
+    "ix_books_user_id_created_at_uid",
+    "ix_reviews_book_uid_created_at_uid",
+    "ix_reviews_user_uid_created_at",
+    "ix_tags_name",
+)
+
+SEED_TABLES = {
+    "users": (
+        text("SELECT count(*) FROM users WHERE email LIKE :email_pattern"),
+        text("""
+            INSERT INTO users (
+                uid, username, email, first_name, last_name, role,
+                password_hash, is_verified, created_at, updated_at
+            )
+            SELECT
+                gen_random_uuid(), 'bench' || n, 'bench-' || n || :domain,
+                'Bench', 'User', 'user', 'unusable', true,
+                now() - random() * interval '3650 days', now()
+            FROM generate_series(:start, :stop) AS n
+            """),
+    ),
+    "books": (
+        text("SELECT count(*) FROM books WHERE publisher = :publisher"),
+        text("""
+            WITH bench_users AS (
+                SELECT array_agg(uid) AS uids FROM users WHERE email LIKE :email_pattern
+            )
+            INSERT INTO books (
+                uid, title, author, publisher, published_date, page_count,
+                language, user_id, created_at, updated_at
+            )
+            SELECT
+                gen_random_uuid(), 'Bench Book ' || n, 'Bench Author', :publisher,
+                date '1950-01-01' + floor(random() * 27000)::int,
+                50 + floor(random() * 900)::int, 'en',
+                uids[1 + floor(power(random(), 2) * cardinality(uids))::int],
+                now() - random() * interval '3650 days', now()
+            FROM bench_users, generate_series(:start, :stop) AS n
+            """),
+    ),
+    "reviews": (
+        text("""
+            SELECT count(*) FROM reviews JOIN books ON books.uid = reviews.book_uid
+            WHERE books.publisher = :publisher
+            """),
+        text("""
+            WITH bench AS (
+                SELECT
+                    (SELECT array_agg(uid) FROM users WHERE email LIKE :email_pattern)
+                        AS user_uids,
+                    (SELECT array_agg(uid) FROM books WHERE publisher = :publisher)
+                        AS book_uids
+            )
+            INSERT INTO reviews (
+                uid, rating, review_text, user_uid, book_uid, created_at, updated_at
+            )
+            SELECT
+                gen_random_uuid(), floor(random() * 5)::int, 'Bench review ' || n,
+                user_uids[1 + floor(random() * cardinality(user_uids))::int],
+                book_uids[1 + floor(power(random(), 3) * cardinality(book_uids))::int],
+                now() - random() * interval '3650 days', now()
+            FROM bench, generate_series(:start, :stop) AS n
+            """),
+    ),
+    "tags": (
+        text("SELECT count(*) FROM tags WHERE name LIKE :tag_pattern"),
+        text("""
+            INSERT INTO tags (uid, name, created_at)
+            SELECT gen_random_uuid(), CAST(:tag_prefix AS text) || n, now()
+            FROM generate_series(:start, :stop) AS n
+            """),
+    ),
+}
+
+LINK_TAGS_SQL = text("""
+    WITH bench_tags AS (
+        SELECT array_agg(uid) AS uids FROM tags WHERE name LIKE :tag_pattern
+    )
+    INSERT INTO booktag (book_id, tag_id)
+    SELECT books.uid, uids[1 + floor(random() * cardinality(uids))::int]
+    FROM bench_tags, books, generate_series(1, :per_book)
+    WHERE books.publisher = :publisher
+    ON CONFLICT DO NOTHING
+    """)
+
+CLEANUP_SQL = (
+    text("""
+        DELETE FROM booktag USING books
+        WHERE booktag.book_id = books.uid AND books.publisher = :publisher
+        """),
+    text("""
+        DELETE FROM booktag USING tags
+        WHERE booktag.tag_id = tags.uid AND tags.name LIKE :tag_pattern
+        """),
+    text("""
+        DELETE FROM reviews USING books
+        WHERE reviews.book_uid = books.uid AND books.publisher = :publisher
+        """),
+    text("DELETE FROM books WHERE publisher = :publisher"),
+    text("DELETE FROM tags WHERE name LIKE :tag_pattern"),
+    text("DELETE FROM users WHERE email LIKE :email_pattern"),
+)
+
+PARAMS = {
+    "domain": BENCH_DOMAIN,
+    "email_pattern": f"%{BENCH_DOMAIN}",
+    "publisher": BENCH_PUBLISHER,
+    "tag_prefix": BENCH_TAG_PREFIX,
+    "tag_pattern": f"{BENCH_TAG_PREFIX}%",
+}
+
+
+class StatementRecorder:
+    """Records the statements executed on the app's engine."""
+
+    def __init__(self) -> None:
+        self.statements = []
+        event.listen(
+            async_engine.sync_engine, "before_cursor_execute", self._on_execute
+        )
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append((statement, parameters))
+
+    def take(self):
+        statements, self.statements = self.statements, []
+        return statements
+
+
+async def seed(targets: dict):
+    for table, (count_sql, insert_sql) in SEED_TABLES.items():
+        async with async_engine.begin() as conn:
+            existing = await conn.scalar(count_sql, PARAMS)
+        target = targets[table]
+        print(f"{table}: {existing} benchmark rows present, target {target}")
+
+        start = existing + 1
+        while start <= target:
+            stop = min(start + SEED_BATCH - 1, target)
+            async with async_engine.begin() as conn:
+                await conn.execute(insert_sql, {**PARAMS, "start": start, "stop": stop})
+            print(f"  {stop} / {target}")
+            start = stop + 1
+
+    async with async_engine.begin() as conn:
+        await conn.execute(LINK_TAGS_SQL, {**PARAMS, "per_book": TAGS_PER_BOOK})
+
+    # Seeded reviews bypass the service, so bring the book aggregates up to date
+    async with SessionFactory() as session:
+        updated = await BookService().reconcile_rating_aggregates(session)
+    print(f"Reconciled rating aggregates of {updated} books")
+
+    async with async_engine.begin() as conn:
+        for table in ("users", "books", "reviews", "tags", "booktag"):
+            await conn.execute(text(f"ANALYZE {table}"))
+
+
+async def cleanup():
+    async with async_engine.begin() as conn:
+        for statement in CLEANUP_SQL:
+            await conn.execute(statement, PARAMS)
+    print("Removed benchmark rows")
+
+
+async def pick_probes() -> dict:
+    """Pick the heaviest benchmark user and book so the lookups do real work."""
+    async with async_engine.begin() as conn:
+        user_uid, email = (
+            await conn.execute(
+                text("""
+                    SELECT users.uid, users.email FROM books
+                    JOIN users ON users.uid = books.user_id
+                    WHERE books.publisher = :publisher
+                    GROUP BY users.uid, users.email
+                    ORDER BY count(*) DESC LIMIT 1
+                    """),
+                PARAMS,
+            )
+        ).one()
+        book_uid = await conn.scalar(
+            text("""
+                SELECT reviews.book_uid FROM reviews
+                JOIN books ON books.uid = reviews.book_uid
+                WHERE books.publisher = :publisher
+                GROUP BY reviews.book_uid
+                ORDER BY count(*) DESC LIMIT 1
+                """),
+            PARAMS,
+        )
+        tag_names = (
+            await conn.scalars(
+                text("SELECT name FROM tags WHERE name LIKE :tag_pattern LIMIT 20"),
+                PARAMS,
+            )
+        ).all()
+    return {
+        "user_uid": user_uid,
+        "email": email,
+        "book_uid": book_uid,
+        "tag_names": list(tag_names),
+    }
+
+
+async def record_queries(probes: dict):
+    """Run the service lookups once and return (label, statement, params)."""
+    user_service = UserService()
+    book_service = BookService()
+    tag_service = TagService()
+
+    cases = {
+        "UserService.get_user_by_email": lambda session: user_service.get_user_by_email(
+            probes["email"], session
+        ),
+        "BookService.get_user_books": lambda session: book_service.get_user_books(
+            probes["user_uid"], session
+        ),
+        "UserService.get_user_with_library": lambda session: user_service.get_user_with_library(
+            probes["email"], session
+        ),
+        "BookService.get_book_reviews": lambda session: book_service.get_book_reviews(
+            probes["book_uid"], session
+        ),
+        "TagService.upsert_tags": lambda session: tag_service.upsert_tags(
+            probes["tag_names"], session
+        ),
+    }
+
+    recorder = StatementRecorder()
+    queries = []
+    for label, call in cases.items():
+        async with SessionFactory() as session:
+            recorder.take()
+            await call(session)
+            statements = recorder.take()
+            await session.rollback()
+        # Only reads can be replayed; the upsert's INSERT is a no-op here anyway
+        for statement, parameters in statements:
+            if statement.lstrip().upper().startswith("SELECT"):
+                queries.append((label, statement, parameters))
+    return queries
+
+
+async def measure(queries, repeat: int, drop_indexes: bool):
+    results = []
+    async with async_engine.connect() as conn:
+        transaction = await conn.begin()
+        try:
+            if drop_indexes:
+                for index in LOOKUP_INDEXES:
+                    await conn.exec_driver_sql(f"DROP INDEX IF EXISTS {index}")
+
+            for label, statement, parameters in queries:
+                result = await conn.exec_driver_sql(
+                    f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters
+                )
+                plan = [row[0] for row in result]
+
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    await conn.exec_driver_sql(statement, parameters)
+                    timings.append((time.perf_counter() - start) * 1000)
+
+                results.append({"plan": plan, "timings": timings})
+        finally:
+            await transaction.rollback()
+    return results
+
+
+def scan_summary(plan) -> str:
+    """The scan nodes of a plan, e.g. 'Index Scan using ix_users_email on users'."""
+    scans = []
+    for line in plan:
+        node = line.strip().lstrip("-> ").split("  (")[0]
+        if "Scan" in node:
+            scans.append(node)
+    return "; ".join(scans) or plan[0].split("  (")[0]
+
+
+async def run(args):
+    await init_db()
+    if args.cleanup:
+        await cleanup()
+        return
+
+    if not args.skip_seed:
+        await seed(
+            {
+                "users": args.users,
+                "books": args.books,
+                "reviews": args.reviews,
+                "tags": args.tags,
+            }
+        )
+
+    probes = await pick_probes()
+    queries = await record_queries(probes)
+    before = await measure(queries, args.repeat, drop_indexes=True)
+    after = await measure(queries, args.repeat, drop_indexes=False)
+
+    for (label, statement, _), without, with_ in zip(queries, before, after):
+        print(f"\n{label}")
+        print(f"  {' '.join(statement.split())[:120]}")
+        for name, result in (("without indexes", without), ("with indexes", with_)):
+            timings = result["timings"]
+            print(
+                f"  {name:<16} p50 {percentile(timings, 50):8.2f} ms"
+                f"  p95 {percentile(timings, 95):8.2f} ms"
+                f"  {scan_summary(result['plan'])}"
+            )
+            if args.plans:
+                for line in result["plan"]:
+                    print(f"      {line}")
+
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--books", type=int, default=200000)
+    parser.add_argument("--reviews", type=int, default=1000000)
+    parser.add_argument("--tags", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=50, help="Timed runs per query")
+    parser.add_argument("--plans", action="store_true", help="Print full plans")
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--cleanup", action="store_true")
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
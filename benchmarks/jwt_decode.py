@@ -0,0 +1,102 @@
+"""
+Compare JWT verification throughput with and without the local token cache.
+
+Usage:
+    python -m benchmarks.jwt_decode [--iterations 20000]
+
+RS256 is skipped when the `cryptography` package is not installed.
+"""
+
+import argparse
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import jwt
+
+from src.auth.token_cache import TOKEN_LEEWAY, TokenCache
+
+
+def make_keys(algorithm: str):
+    """Return (signing key, verification key) for the algorithm."""
+    if algorithm == "HS256":
+        secret = uuid.uuid4().hex
+        return secret, secret
+
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return private_key, private_key.public_key()
+
+
+def make_token(algorithm: str, signing_key) -> str:
+    now = datetime.now(timezone.utc)
+    payload = {
+        "user": {
+            "email": "bench@bookly.dev",
+            "user_uid": str(uuid.uuid4()),
+            "role": "user",
+        },
+        "exp": now + timedelta(hours=1),
+        "iat": now,
+        "jti": str(uuid.uuid4()),
+        "refresh": False,
+    }
+    return jwt.encode(payload=payload, key=signing_key, algorithm=algorithm)
+
+
+def run(algorithm: str, iterations: int) -> dict:
+    signing_key, verify_key = make_keys(algorithm)
+    token = make_token(algorithm, signing_key)
+
+    def decode():
+        return jwt.decode(
+            jwt=token, key=verify_key, algorithms=[algorithm], leeway=TOKEN_LEEWAY
+        )
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        decode()
+    uncached = time.perf_counter() - start
+
+    cache = TokenCache(maxsize=10000, leeway=TOKEN_LEEWAY)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        claims = cache.get(token)
+        if claims is None:
+            claims = decode()
+            cache.put(token, claims)
+    cached = time.perf_counter() - start
+
+    return {
+        "algorithm": algorithm,
+        "uncached_ops": iterations / uncached,
+        "cached_ops": iterations / cached,
+        "uncached_us": uncached / iterations * 1e6,
+        "cached_us": cached / iterations * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(
+        f"{'alg':<6} {'no cache ops/s':>15} {'cache ops/s':>13} {'no cache us':>12} {'cache us':>9}"
+    )
+    for algorithm in ("HS256", "RS256"):
+        try:
+            result = run(algorithm, args.iterations)
+        except ImportError:
+            print(f"{algorithm:<6} skipped (cryptography is not installed)")
+            continue
+        print(
+            f"{result['algorithm']:<6} {result['uncached_ops']:>15,.0f} "
+            f"{result['cached_ops']:>13,.0f} {result['uncached_us']:>12.2f} "
+            f"{result['cached_us']:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,472 @@
+"""
+Load test the API and report throughput, latency percentiles and SQL statements per request.
+
+Usage:
+    python -m benchmarks.load [--users 50] [--books 2000] [--reviews 2000] [--tags 200]
+        [--concurrency 16] [--duration 30] [--warmup 3]
+        [--mix login=1,list=4,detail=4,review=1,tag=1]
+        [--output PATH] [--compare PATH] [--skip-seed] [--cleanup]
+
+Seeds the database and Redis configured in .env through the services. Seeded
+users share one password, so set a low BCRYPT_ROUNDS to seed quickly, and
+set RATE_LIMIT_ENABLED=false unless the limiter itself is under test. The
+script then runs `--concurrency` httpx clients against the real app over an
+ASGI transport for `--duration` seconds, and each request picks a workload
+from `--mix`. Clients and app share one event loop, so compare runs made
+on the same machine only.
+
+Results are written as JSON tagged with the current git commit.
+--compare prints the change against an earlier result file.
+"""
+
+import argparse
+import asyncio
+import contextvars
+import json
+import random
+import statistics
+import subprocess
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+from sqlalchemy import event, func, text
+from sqlmodel import select
+
+from benchmarks.utils import percentile
+from src import app, version
+from src.auth.schemas import UserCreateModel
+from src.auth.service import UserService
+from src.books.service import BookService
+from src.db.models import Book, BookTag, Review, User
+from src.db.postgres import SessionFactory, async_engine, init_db
+from src.reviews.schemas import ReviewCreateModel
+from src.reviews.service import ReviewService
+from src.tags.schemas import BookTagAddModel, TagBatchAddModel, TagCreateModel
+from src.tags.service import TagService
+
+API = f"/api/{version}"
+RESULTS_DIR = Path(__file__).with_name("results")
+
+LOAD_DOMAIN = "@load.bookly.dev"
+LOAD_PASSWORD = "load-test-password"
+LOAD_TAG_PREFIX = "load-"
+SEED_CONCURRENCY = 8
+TAG_BATCH = 1000
+TAGS_PER_BOOK = 3
+
+DEFAULT_MIX = "login=1,list=4,detail=4,review=1,tag=1"
+
+# Statement counter of the request being sent by the current client task
+sql_statements = contextvars.ContextVar("sql_statements", default=None)
+
+
+def count_statement(*args) -> None:
+    counter = sql_statements.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+user_service = UserService()
+book_service = BookService()
+review_service = ReviewService()
+tag_service = TagService()
+
+
+async def load_fixture() -> dict:
+    """Return the user emails and uids and the book uids of the seeded data."""
+    async with SessionFactory() as session:
+        users = (
+            await session.exec(
+                select(User.email, User.uid).where(User.email.like(f"%{LOAD_DOMAIN}"))
+            )
+        ).all()
+        book_uids = (
+            await session.exec(
+                select(Book.uid)
+                .join(User, User.uid == Book.user_id)
+                .where(User.email.like(f"%{LOAD_DOMAIN}"))
+            )
+        ).all()
+        review_count = await session.scalar(
+            select(func.count())
+            .select_from(Review)
+            .join(User, User.uid == Review.user_uid)
+            .where(User.email.like(f"%{LOAD_DOMAIN}"))
+        )
+    return {
+        "emails": [email for email, _ in users],
+        "user_uids": [str(uid) for _, uid in users],
+        "book_uids": [str(uid) for uid in book_uids],
+        "review_count": review_count,
+    }
+
+
+async def gather_in_chunks(coroutines, size: int = SEED_CONCURRENCY):
+    coroutines = list(coroutines)
+    for start in range(0, len(coroutines), size):
+        await asyncio.gather(*coroutines[start : start + size])
+
+
+async def seed_user(index: int):
+    async with SessionFactory() as session:
+        await user_service.create_user(
+            UserCreateModel(
+                username=f"load{index}",
+                email=f"load-{index}{LOAD_DOMAIN}",
+                password=LOAD_PASSWORD,
+                first_name="Load",
+                last_name="Test",
+            ),
+            session,
+        )
+
+
+async def seed_books(email: str, start: int, count: int):
+    async def rows():
+        for index in range(start, start + count):
+            yield index, {
+                "title": f"Load Test Book {index}",
+                "author": f"Author {index % 97}",
+                "publisher": "Bookly Load Test",
+                "published_date": "2020-01-01",
+                "page_count": 100 + index % 400,
+                "language": "en",
+            }
+
+    async with SessionFactory() as session:
+        user = await user_service.get_user_by_email(email, session)
+        await book_service.bulk_create_books(rows(), user.uid, session)
+
+
+async def seed_review(user_uid: str, book_uid: str):
+    async with SessionFactory() as session:
+        await review_service.add_review_to_book(
+            user_uid=user_uid,
+            book_uid=book_uid,
+            review_data=ReviewCreateModel(
+                rating=random.randrange(5), review_text="Seeded by the load test"
+            ),
+            session=session,
+        )
+
+
+def tag_names(tag_count: int, count: int):
+    return [
+        TagCreateModel(name=f"{LOAD_TAG_PREFIX}{random.randrange(tag_count)}")
+        for _ in range(count)
+    ]
+
+
+def popular(items):
+    """Pick an item, skewed towards the start of the list like real traffic."""
+    return items[int(len(items) * random.random() ** 2)]
+
+
+async def seed(args) -> dict:
+    fixture = await load_fixture()
+
+    existing = len(fixture["emails"])
+    print(f"users: {existing} present, target {args.users}")
+    await gather_in_chunks(seed_user(index) for index in range(existing, args.users))
+    fixture = await load_fixture()
+
+    existing = len(fixture["book_uids"])
+    print(f"books: {existing} present, target {args.books}")
+    missing = max(args.books - existing, 0)
+    if missing:
+        emails = fixture["emails"]
+        per_user = -(-missing // len(emails))
+        await gather_in_chunks(
+            seed_books(email, existing + offset, min(per_user, missing - offset))
+            for email, offset in zip(emails, range(0, missing, per_user))
+        )
+
+    async with SessionFactory() as session:
+        untagged = (
+            await session.exec(
+                select(Book.uid)
+                .join(User, User.uid == Book.user_id)
+                .where(
+                    User.email.like(f"%{LOAD_DOMAIN}"),
+                    ~select(BookTag.book_id)
+                    .where(BookTag.book_id == Book.uid)
+                    .exists(),
+                )
+            )
+        ).all()
+        print(f"tags: tagging {len(untagged)} books from {args.tags} tags")
+        for start in range(0, len(untagged), TAG_BATCH):
+            await tag_service.add_tags_to_books(
+                TagBatchAddModel(
+                    books=[
+                        BookTagAddModel(
+                            book_uid=book_uid,
+                            tags=tag_names(args.tags, TAGS_PER_BOOK),
+                        )
+                        for book_uid in untagged[start : start + TAG_BATCH]
+                    ]
+                ),
+                session,
+            )
+    fixture = await load_fixture()
+
+    existing = fixture["review_count"]
+    print(f"reviews: {existing} present, target {args.reviews}")
+    await gather_in_chunks(
+        seed_review(random.choice(fixture["user_uids"]), popular(fixture["book_uids"]))
+        for _ in range(max(args.reviews - existing, 0))
+    )
+
+    async with async_engine.begin() as conn:
+        for table in ("users", "books", "reviews", "tags", "booktag"):
+            await conn.execute(text(f"ANALYZE {table}"))
+
+    return fixture
+
+
+async def cleanup():
+    params = {"email_pattern": f"%{LOAD_DOMAIN}", "tag_pattern": f"{LOAD_TAG_PREFIX}%"}
+    load_books = """
+        SELECT books.uid FROM books JOIN users ON users.uid = books.user_id
+        WHERE users.email LIKE :email_pattern
+    """
+    async with async_engine.begin() as conn:
+        for statement in (
+            f"DELETE FROM booktag WHERE book_id IN ({load_books})",
+            """
+            DELETE FROM booktag USING tags
+            WHERE booktag.tag_id = tags.uid AND tags.name LIKE :tag_pattern
+            """,
+            f"DELETE FROM reviews WHERE book_uid IN ({load_books})",
+            """
+            DELETE FROM reviews USING users
+            WHERE reviews.user_uid = users.uid AND users.email LIKE :email_pattern
+            """,
+            f"DELETE FROM books WHERE uid IN ({load_books})",
+            "DELETE FROM tags WHERE name LIKE :tag_pattern",
+            "DELETE FROM users WHERE email LIKE :email_pattern",
+        ):
+            await conn.execute(text(statement), params)
+    print("Removed load test rows")
+
+
+async def login(client: httpx.AsyncClient, fixture: dict, args):
+    return await client.post(
+        f"{API}/auth/login",
+        json={"email": random.choice(fixture["emails"]), "password": LOAD_PASSWORD},
+    )
+
+
+async def list_books(client: httpx.AsyncClient, fixture: dict, args):
+    return await client.get(f"{API}/books", params={"limit": 20})
+
+
+async def book_detail(client: httpx.AsyncClient, fixture: dict, args):
+    return await client.get(f"{API}/books/{popular(fixture['book_uids'])}")
+
+
+async def add_review(client: httpx.AsyncClient, fixture: dict, args):
+    return await client.post(
+        f"{API}/reviews/book/{popular(fixture['book_uids'])}",
+        json={"rating": random.randrange(5), "review_text": "Load test review"},
+    )
+
+
+async def add_tags(client: httpx.AsyncClient, fixture: dict, args):
+    return await client.post(
+        f"{API}/books/{random.choice(fixture['book_uids'])}/tags",
+        json={"tags": [tag.model_dump() for tag in tag_names(args.tags, 2)]},
+    )
+
+
+WORKLOADS = {
+    "login": login,
+    "list": list_books,
+    "detail": book_detail,
+    "review": add_review,
+    "tag": add_tags,
+}
+
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in WORKLOADS:
+            raise argparse.ArgumentTypeError(f"Unknown workload {name!r}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def client_loop(fixture: dict, args, record_from: float, deadline: float):
+    """One client: log in once, then send requests until the deadline."""
+    samples = defaultdict(list)
+    names = list(args.mix)
+    weights = list(args.mix.values())
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://localhost", timeout=60
+    ) as client:
+        response = await login(client, fixture, args)
+        response.raise_for_status()
+        client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+
+        while (now := time.perf_counter()) < deadline:
+            name = random.choices(names, weights)[0]
+            counter = [0]
+            token = sql_statements.set(counter)
+            start = time.perf_counter()
+            try:
+                response = await WORKLOADS[name](client, fixture, args)
+                status_code = response.status_code
+            except httpx.HTTPError:
+                status_code = 0
+            finally:
+                sql_statements.reset(token)
+            elapsed = (time.perf_counter() - start) * 1000
+
+            if now >= record_from:
+                samples[name].append((elapsed, counter[0], status_code))
+
+    return samples
+
+
+def summarize(samples: dict, duration: float) -> dict:
+    def stats(rows):
+        latencies = [row[0] for row in rows]
+        return {
+            "requests": len(rows),
+            "errors": sum(1 for row in rows if not 200 <= row[2] < 400),
+            "rps": len(rows) / duration,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+            "mean_ms": statistics.mean(latencies),
+            "sql_per_request": statistics.mean(row[1] for row in rows),
+        }
+
+    results = {name: stats(rows) for name, rows in sorted(samples.items()) if rows}
+    everything = [row for rows in samples.values() for row in rows]
+    if everything:
+        results["all"] = stats(everything)
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_results(results: dict, baseline: dict = None):
+    print(
+        f"{'workload':<8} {'requests':>8} {'errors':>6} {'rps':>8} {'p50 ms':>8} "
+        f"{'p95 ms':>8} {'p99 ms':>8} {'sql/req':>7}"
+    )
+    for name, row in results.items():
+        line = (
+            f"{name:<8} {row['requests']:>8} {row['errors']:>6} {row['rps']:>8.1f} "
+            f"{row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f} "
+            f"{row['sql_per_request']:>7.2f}"
+        )
+        previous = (baseline or {}).get(name)
+        if previous:
+            rps = (row["rps"] / previous["rps"] - 1) * 100
+            p95 = (row["p95_ms"] / previous["p95_ms"] - 1) * 100
+            line += f"   rps {rps:+.1f}%  p95 {p95:+.1f}%"
+        print(line)
+
+
+async def run(args):
+    await init_db()
+    if args.cleanup:
+        await cleanup()
+        return
+
+    fixture = await load_fixture() if args.skip_seed else await seed(args)
+    if not fixture["emails"] or not fixture["book_uids"]:
+        raise SystemExit("No seeded users or books, run without --skip-seed first")
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count_statement)
+
+    start = time.perf_counter()
+    record_from = start + args.warmup
+    deadline = record_from + args.duration
+    per_client = await asyncio.gather(
+        *(
+            client_loop(fixture, args, record_from, deadline)
+            for _ in range(args.concurrency)
+        )
+    )
+    await async_engine.dispose()
+
+    samples = defaultdict(list)
+    for client_samples in per_client:
+        for name, rows in client_samples.items():
+            samples[name].extend(rows)
+
+    return summarize(samples, args.duration)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--books", type=int, default=2000)
+    parser.add_argument("--reviews", type=int, default=2000)
+    parser.add_argument("--tags", type=int, default=200, help="Distinct tag names")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30, help="Seconds measured")
+    parser.add_argument("--warmup", type=float, default=3, help="Seconds discarded")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX))
+    parser.add_argument("--output", type=Path, help="Result file (JSON)")
+    parser.add_argument("--compare", type=Path, help="Earlier result file")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed")
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--cleanup", action="store_true")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    results = asyncio.run(run(args))
+    if results is None:
+        return
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "users": args.users,
+            "books": args.books,
+            "reviews": args.reviews,
+            "tags": args.tags,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "mix": args.mix,
+        },
+        "results": results,
+    }
+    output = args.output or RESULTS_DIR / f"load-{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+
+    baseline = None
+    if args.compare:
+        previous = json.loads(args.compare.read_text())
+        baseline = previous["results"]
+        print(f"Compared with {previous['commit']} ({args.compare})")
+    print_results(results, baseline)
+    print(f"Wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
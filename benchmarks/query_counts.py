@@ -0,0 +1,224 @@
+"""
+Count the SQL statements each API endpoint issues and fail on regressions.
+
+Usage:
+    python -m benchmarks.query_counts [--budgets benchmarks/query_budgets.json] [--update]
+
+Runs the real app in-process against the database and Redis configured in
+.env and exits with status 1 if any endpoint issues more statements than
+its budget in benchmarks/query_budgets.json, has no budget, or the budgets
+file is missing. After an intended change, --update records the current
+counts; commit the file with the change.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import uuid
+from pathlib import Path
+
+import httpx
+from sqlalchemy import event
+
+from src import app, version
+from src.books.cache import book_cache
+from src.db.postgres import async_engine, init_db
+
+API = f"/api/{version}"
+DEFAULT_BUDGETS = Path(__file__).with_name("query_budgets.json")
+
+
+class StatementCounter:
+    """Counts statements executed on the app's engine."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        event.listen(
+            async_engine.sync_engine, "before_cursor_execute", self._on_execute
+        )
+
+    def _on_execute(self, *args) -> None:
+        self.count += 1
+
+    def reset(self) -> None:
+        self.count = 0
+
+
+async def measure(
+    counter: StatementCounter, client: httpx.AsyncClient, method, url, **kwargs
+):
+    counter.reset()
+    response = await client.request(method, url, **kwargs)
+    if response.status_code >= 400:
+        raise RuntimeError(
+            f"{method} {url} failed: {response.status_code} {response.text}"
+        )
+    return response, counter.count
+
+
+async def collect_counts() -> dict:
+    await init_db()
+    counter = StatementCounter()
+    counts = {}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://localhost"
+    ) as client:
+        email = f"query-count-{uuid.uuid4().hex[:8]}@bookly.dev"
+        password = "query-count-password"
+
+        _, counts["POST /auth/signup"] = await measure(
+            counter,
+            client,
+            "POST",
+            f"{API}/auth/signup",
+            json={
+                "username": "querycount",
+                "email": email,
+                "password": password,
+                "first_name": "Query",
+                "last_name": "Count",
+            },
+        )
+        response, counts["POST /auth/login"] = await measure(
+            counter,
+            client,
+            "POST",
+            f"{API}/auth/login",
+            json={"email": email, "password": password},
+        )
+        login = response.json()
+        headers = {"Authorization": f"Bearer {login['access_token']}"}
+        user_uid = login["user"]["uid"]
+
+        response, counts["POST /books"] = await measure(
+            counter,
+            client,
+            "POST",
+            f"{API}/books",
+            headers=headers,
+            json={
+                "title": "Query Count",
+                "author": "Bookly",
+                "publisher": "Bookly",
+                "published_date": "2024-01-01",
+                "page_count": 100,
+                "language": "en",
+            },
+        )
+        book_uid = response.json()["uid"]
+
+        _, counts["POST /books/{book_uid}/tags"] = await measure(
+            counter,
+            client,
+            "POST",
+            f"{API}/books/{book_uid}/tags",
+            headers=headers,
+            json={
+                "tags": [{"name": "fiction"}, {"name": f"qc-{uuid.uuid4().hex[:6]}"}]
+            },
+        )
+        _, counts["POST /books/tags"] = await measure(
+            counter,
+            client,
+            "POST",
+            f"{API}/books/tags",
+            headers=headers,
+            json={
+                "books": [
+                    {
+                        "book_uid": book_uid,
+                        "tags": [
+                            {"name": f"qc-{uuid.uuid4().hex[:6]}"} for _ in range(50)
+                        ],
+                    }
+                ]
+            },
+        )
+        _, counts["POST /reviews/book/{book_uid}"] = await measure(
+            counter,
+            client,
+            "POST",
+            f"{API}/reviews/book/{book_uid}",
+            headers=headers,
+            json={"rating": 4, "review_text": "Counted"},
+        )
+
+        _, counts["GET /reviews/book/{book_uid}"] = await measure(
+            counter, client, "GET", f"{API}/reviews/book/{book_uid}", headers=headers
+        )
+
+        _, counts["GET /books"] = await measure(
+            counter, client, "GET", f"{API}/books", headers=headers
+        )
+        _, counts["GET /books/user/{user_uid}"] = await measure(
+            counter, client, "GET", f"{API}/books/user/{user_uid}", headers=headers
+        )
+
+        # Measure the database path, not the Redis cache
+        await book_cache.invalidate(book_uid)
+        _, counts["GET /books/{book_uid}"] = await measure(
+            counter, client, "GET", f"{API}/books/{book_uid}", headers=headers
+        )
+
+        _, counts["GET /auth/me"] = await measure(
+            counter, client, "GET", f"{API}/auth/me", headers=headers
+        )
+        _, counts["GET /tags"] = await measure(
+            counter, client, "GET", f"{API}", headers=headers
+        )
+        _, counts["PATCH /books/{book_uid}"] = await measure(
+            counter,
+            client,
+            "PATCH",
+            f"{API}/books/{book_uid}",
+            headers=headers,
+            json={"title": "Query Count 2"},
+        )
+        _, counts["DELETE /books/{book_uid}"] = await measure(
+            counter, client, "DELETE", f"{API}/books/{book_uid}", headers=headers
+        )
+
+    await async_engine.dispose()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budgets", type=Path, default=DEFAULT_BUDGETS)
+    parser.add_argument("--update", action="store_true", help="Record current counts")
+    args = parser.parse_args()
+
+    if not args.update and not args.budgets.exists():
+        print(f"No query budgets at {args.budgets}, record them with --update")
+        sys.exit(1)
+
+    counts = asyncio.run(collect_counts())
+
+    if args.update:
+        args.budgets.write_text(json.dumps(counts, indent=2, sort_keys=True) + "\n")
+        print(f"Recorded query budgets in {args.budgets}")
+
+    budgets = json.loads(args.budgets.read_text())
+    failed = False
+    print(f"{'endpoint':<34} {'queries':>8} {'budget':>7}")
+    for endpoint, count in counts.items():
+        budget = budgets.get(endpoint)
+        status = ""
+        if budget is None:
+            status = "  NO BUDGET"
+            failed = True
+        elif count > budget:
+            status = "  REGRESSION"
+            failed = True
+        print(
+            f"{endpoint:<34} {count:>8} {budget if budget is not None else '-':>7}{status}"
+        )
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Measure the per-request overhead of the rate limiter.
+
+Usage:
+    python -m benchmarks.rate_limit [--requests 20000] [--identities 1,100] [--limit 6000/minute]
+
+Runs RateLimiter.hit against the Redis configured in .env, once with leases
+disabled (every request runs the Lua script) and once with the configured
+lease fraction, spreading requests over `--identities` callers. Reports the
+mean and p99 cost per request and how many requests were decided without a
+Redis round trip. The limit is sized so the benchmark is never rejected.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+from benchmarks.utils import percentile
+from src.config import Config
+from src.db.redis import redis_client
+from src.ratelimit import RateLimiter
+
+
+async def run(limiter: RateLimiter, requests: int, identities: int) -> dict:
+    rule = limiter.rules[0]
+    callers = [f"bench:{index}" for index in range(identities)]
+    samples = []
+    for index in range(requests):
+        start = time.perf_counter()
+        allowed, _, _ = await limiter.hit(rule, "user", callers[index % identities])
+        samples.append(time.perf_counter() - start)
+        assert allowed, "Benchmark limit too low, raise --limit"
+    return {
+        "mean_us": statistics.fmean(samples) * 1e6,
+        "p99_us": percentile(samples, 99) * 1e6,
+        "local_ratio": limiter.stats()["local_ratio"],
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--identities", default="1,100")
+    parser.add_argument("--limit", default="6000/minute")
+    args = parser.parse_args()
+
+    await redis_client.ping()
+    # A fresh prefix per run so buckets start full and earlier runs don't interfere
+    prefix = f"ratelimit:bench:{uuid.uuid4().hex[:8]}:"
+    rules = {"GET /bench": {"user": args.limit}}
+
+    print(f"{'identities':>10} {'lease':>8} {'mean us':>9} {'p99 us':>9} {'local':>7}")
+    for identities in (int(value) for value in args.identities.split(",")):
+        for lease_fraction in (0.0, Config.RATE_LIMIT_LEASE_FRACTION):
+            limiter = RateLimiter(
+                redis_client,
+                rules,
+                lease_fraction=lease_fraction,
+                lease_ttl=Config.RATE_LIMIT_LEASE_TTL,
+                key_prefix=f"{prefix}{lease_fraction}:",
+            )
+            result = await run(limiter, args.requests, identities)
+            print(
+                f"{identities:>10} {lease_fraction:>8} {result['mean_us']:>9.1f} "
+                f"{result['p99_us']:>9.1f} {result['local_ratio']:>7.1%}"
+            )
+
+    keys = [key async for key in redis_client.scan_iter(f"{prefix}*")]
+    if keys:
+        await redis_client.delete(*keys)
+    await redis_client.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
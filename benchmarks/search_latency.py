@@ -0,0 +1,175 @@
+"""
+Measure book search latency against a large, generated catalog.
+
+Usage:
+    python -m benchmarks.search_latency [--rows 1000000] [--queries 500] [--skip-seed] [--cleanup]
+
+Generates rows server-side with generate_series into the database configured
+in .env (tagged with a dedicated publisher so --cleanup can remove them),
+then times BookService.search_books for a mix of word, prefix and misspelled
+queries and reports p50/p95/p99.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from sqlalchemy import ARRAY, String, bindparam, text
+
+from benchmarks.utils import percentile
+from src.books.service import BookService
+from src.db.postgres import SessionFactory, async_engine, init_db
+
+BENCH_PUBLISHER = "Bookly Bench Press"
+SEED_BATCH = 100000
+
+WORDS = (
+    "shadow river empire garden silent winter crown ocean midnight stone forest "
+    "dragon letters island memory glass harbor storm kingdom library mountain "
+    "secret summer journey mirror thunder orchard lantern voyage castle whisper "
+    "meadow ember falcon compass horizon"
+).split()
+AUTHORS = [
+    "Ada Lovelace",
+    "Chinua Achebe",
+    "Toni Morrison",
+    "Haruki Murakami",
+    "Ursula Le Guin",
+    "Jorge Borges",
+    "Octavia Butler",
+    "Italo Calvino",
+]
+
+SEED_SQL = text("""
+    WITH vocabulary AS (
+        SELECT CAST(:words AS text[]) AS words, CAST(:authors AS text[]) AS authors
+    )
+    INSERT INTO books (
+        uid, title, author, publisher, published_date, page_count, language,
+        created_at, updated_at
+    )
+    SELECT
+        gen_random_uuid(),
+        initcap(
+            words[1 + floor(random() * cardinality(words))::int] || ' ' ||
+            words[1 + floor(random() * cardinality(words))::int] || ' ' ||
+            words[1 + floor(random() * cardinality(words))::int]
+        ),
+        authors[1 + floor(random() * cardinality(authors))::int],
+        :publisher,
+        date '1950-01-01' + floor(random() * 27000)::int,
+        50 + floor(random() * 900)::int,
+        'en',
+        now() - random() * interval '3650 days',
+        now()
+    FROM vocabulary, generate_series(1, :count)
+    """).bindparams(
+    bindparam("words", type_=ARRAY(String)),
+    bindparam("authors", type_=ARRAY(String)),
+)
+
+
+def make_queries(count: int):
+    queries = []
+    for _ in range(count):
+        kind = random.random()
+        word = random.choice(WORDS)
+        if kind < 0.5:
+            queries.append(f"{word} {random.choice(WORDS)}")
+        elif kind < 0.75:
+            queries.append(word[: random.randint(3, 5)])
+        elif kind < 0.9:
+            position = random.randrange(len(word))
+            queries.append(word[:position] + word[position + 1 :])
+        else:
+            queries.append(random.choice(AUTHORS).split()[1])
+    return queries
+
+
+async def seed(rows: int):
+    async with async_engine.begin() as conn:
+        existing = await conn.scalar(
+            text("SELECT count(*) FROM books WHERE publisher = :publisher"),
+            {"publisher": BENCH_PUBLISHER},
+        )
+    remaining = max(rows - existing, 0)
+    print(f"{existing} benchmark rows present, inserting {remaining}")
+
+    while remaining:
+        count = min(SEED_BATCH, remaining)
+        async with async_engine.begin() as conn:
+            await conn.execute(
+                SEED_SQL,
+                {
+                    "words": WORDS,
+                    "authors": AUTHORS,
+                    "publisher": BENCH_PUBLISHER,
+                    "count": count,
+                },
+            )
+        remaining -= count
+        print(f"  {rows - remaining} / {rows}")
+
+    async with async_engine.begin() as conn:
+        await conn.execute(text("ANALYZE books"))
+
+
+async def cleanup():
+    async with async_engine.begin() as conn:
+        result = await conn.execute(
+            text("DELETE FROM books WHERE publisher = :publisher"),
+            {"publisher": BENCH_PUBLISHER},
+        )
+    print(f"Removed {result.rowcount} benchmark rows")
+
+
+async def run(args):
+    await init_db()
+    if args.cleanup:
+        await cleanup()
+        return
+
+    if not args.skip_seed:
+        await seed(args.rows)
+
+    book_service = BookService()
+    queries = make_queries(args.queries)
+    timings = []
+
+    async with SessionFactory() as session:
+        # Warm up the connection and plan cache
+        for query in queries[:10]:
+            await book_service.search_books(query, session, limit=args.limit)
+
+        for query in queries:
+            start = time.perf_counter()
+            await book_service.search_books(query, session, limit=args.limit)
+            timings.append((time.perf_counter() - start) * 1000)
+
+    print(f"{len(timings)} queries, limit {args.limit}")
+    print(f"  mean {statistics.mean(timings):8.2f} ms")
+    for pct in (50, 95, 99):
+        print(f"  p{pct:<3} {percentile(timings, pct):8.2f} ms")
+    print(f"  max  {max(timings):8.2f} ms")
+
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7, help="Random seed")
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--cleanup", action="store_true")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
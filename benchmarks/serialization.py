@@ -0,0 +1,121 @@
+"""
+Compare the per-row cost of FastAPI's response_model path with TypedJSONResponse.
+
+Usage:
+    python -m benchmarks.serialization [--rows 20,100,1000] [--iterations 200]
+
+Serializes pages of in-memory Book and Tag ORM objects the way the list
+endpoints return them. The baseline runs the same steps FastAPI takes for a
+response_model: validate, dump to a JSON-compatible dict, then render with
+JSONResponse. No database is needed.
+"""
+
+import argparse
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from pydantic import TypeAdapter
+
+from src.books.schemas import BookPageModel
+from src.db.models import Book, Tag
+from src.responses import TypedJSONResponse
+from src.tags.schemas import TagModel
+
+
+def make_books(count: int) -> dict:
+    now = datetime.now()
+    books = [
+        Book(
+            uid=uuid.uuid4(),
+            title=f"Benchmark Book {index}",
+            author="Bookly Bench",
+            publisher="Bookly Bench Press",
+            published_date=date(2020, 1, 1),
+            page_count=100 + index,
+            language="en",
+            created_at=now - timedelta(minutes=index),
+            updated_at=now,
+            review_count=index % 7,
+            rating_sum=(index % 7) * 3,
+            rating_histogram=[index % 7, 0, 0, 0, 0],
+        )
+        for index in range(count)
+    ]
+    return {"items": books, "next_cursor": "bmV4dA"}
+
+
+def make_tags(count: int) -> list:
+    now = datetime.now()
+    return [
+        Tag(uid=uuid.uuid4(), name=f"tag-{index}", created_at=now, updated_at=now)
+        for index in range(count)
+    ]
+
+
+def time_per_row(func, rows: int, iterations: int) -> float:
+    func()  # warm up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations / rows * 1e6
+
+
+def run_to_completion(coroutine):
+    """Run a coroutine that never suspends without an event loop's overhead."""
+    try:
+        coroutine.send(None)
+    except StopIteration as result:
+        return result.value
+    raise RuntimeError("Coroutine suspended")
+
+
+def fastapi_path(field):
+    def render(content) -> bytes:
+        value = run_to_completion(
+            serialize_response(field=field, response_content=content)
+        )
+        return JSONResponse(value).body
+
+    return render
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", default="20,100,1000")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    cases = {
+        "books": (BookPageModel, make_books),
+        "tags": (List[TagModel], make_tags),
+    }
+
+    print(
+        f"{'payload':<8} {'rows':>6} {'response_model us/row':>22} "
+        f"{'TypedJSONResponse us/row':>25} {'speedup':>8}"
+    )
+    for name, (model, make) in cases.items():
+        field = create_model_field("Response", model, mode="serialization")
+        adapter = TypeAdapter(model)
+        baseline = fastapi_path(field)
+
+        for rows in (int(value) for value in args.rows.split(",")):
+            content = make(rows)
+            assert baseline(content) == TypedJSONResponse(content, adapter).body
+
+            slow = time_per_row(lambda: baseline(content), rows, args.iterations)
+            fast = time_per_row(
+                lambda: TypedJSONResponse(content, adapter).body, rows, args.iterations
+            )
+            print(
+                f"{name:<8} {rows:>6} {slow:>22.2f} {fast:>25.2f} {slow / fast:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Measure the per-call Python cost of preparing the hot service queries.
+
+Usage:
+    python -m benchmarks.statement_cache [--iterations 20000] [--database] [--calls 2000]
+
+Without a database, times what SQLAlchemy does before a query reaches the
+driver, for three ways of issuing it:
+
+    compile       build the statement and compile it without any cache
+    per-call      build the statement each call (cache key + compiled cache hit)
+    cached        reuse the service's CachedStatement (memoized key + cache hit)
+
+--database also runs each query through a session against the database in
+.env, with asyncpg's prepared statement cache disabled and at
+DB_PREPARED_STATEMENT_CACHE_SIZE. Rows are created in a transaction that is
+rolled back.
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import date
+
+from sqlalchemy.dialects.postgresql.asyncpg import PGDialect_asyncpg
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.util import LRUCache
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.auth.service import USER_BY_EMAIL, USER_PRINCIPAL_BY_EMAIL
+from src.books.service import BOOK_BY_UID
+from src.config import Config
+from src.db.models import Book, Tag, User
+from src.tags.service import TAG_BY_UID
+
+BENCH_EMAIL = "statement-cache@bench.bookly.dev"
+
+
+def queries(book_uid, email, tag_uid) -> dict:
+    """Per query: a function building it the old way, the cached statement and its params."""
+    return {
+        "get_book": (
+            lambda: select(Book).where(Book.uid == book_uid),
+            BOOK_BY_UID.statement,
+            {"book_uid": book_uid},
+        ),
+        "get_user_by_email": (
+            lambda: select(User).where(User.email == email),
+            USER_BY_EMAIL.statement,
+            {"email": email},
+        ),
+        "get_user_principal": (
+            lambda: select(User.uid, User.email, User.role).where(User.email == email),
+            USER_PRINCIPAL_BY_EMAIL.statement,
+            {"email": email},
+        ),
+        "get_tag_by_uid": (
+            lambda: select(Tag).where(Tag.uid == tag_uid),
+            TAG_BY_UID.statement,
+            {"tag_uid": tag_uid},
+        ),
+    }
+
+
+def time_per_call(func, iterations: int) -> float:
+    func()  # warm up, and fill the compiled cache
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def compile_overhead(iterations: int) -> None:
+    dialect = PGDialect_asyncpg()
+    cache = LRUCache(100)
+
+    def compiled(build, **kwargs):
+        def run():
+            return build()._compile_w_cache(dialect, column_keys=[], **kwargs)
+
+        return run
+
+    print(f"{'query':<20} {'compile us':>11} {'per-call us':>12} {'cached us':>10}")
+    for name, (build, statement, params) in queries(
+        uuid.uuid4(), BENCH_EMAIL, uuid.uuid4()
+    ).items():
+        cold = time_per_call(compiled(build, compiled_cache=None), iterations // 10)
+        per_call = time_per_call(compiled(build, compiled_cache=cache), iterations)
+        cached = time_per_call(
+            lambda: statement._compile_w_cache(
+                dialect, compiled_cache=cache, column_keys=sorted(params)
+            ),
+            iterations,
+        )
+        print(f"{name:<20} {cold:>11.1f} {per_call:>12.1f} {cached:>10.1f}")
+
+
+async def database_overhead(calls: int) -> None:
+    print(
+        f"\n{'query':<20} {'prepared cache':>15} {'per-call us':>12} {'cached us':>10}"
+    )
+    for cache_size in (0, Config.DB_PREPARED_STATEMENT_CACHE_SIZE):
+        engine = create_async_engine(
+            Config.DATABASE_URL,
+            connect_args={"prepared_statement_cache_size": cache_size},
+        )
+        async with AsyncSession(engine) as session:
+            user = User(
+                username="statement-cache",
+                email=BENCH_EMAIL,
+                first_name="Statement",
+                last_name="Cache",
+                password_hash="-",
+            )
+            book = Book(
+                title="Statement Cache",
+                author="Bookly Bench",
+                publisher="Bookly Bench Press",
+                published_date=date(2020, 1, 1),
+                page_count=100,
+                language="en",
+                user=user,
+            )
+            tag = Tag(name=f"statement-cache-{uuid.uuid4().hex[:8]}")
+            session.add_all([user, book, tag])
+            await session.flush()
+
+            for name, (build, statement, params) in queries(
+                book.uid, user.email, tag.uid
+            ).items():
+                results = []
+                for run in (
+                    lambda: session.exec(build()),
+                    lambda: session.exec(statement, params=params),
+                ):
+                    (await run()).all()  # warm up
+                    start = time.perf_counter()
+                    for _ in range(calls):
+                        (await run()).all()
+                    results.append((time.perf_counter() - start) / calls * 1e6)
+                print(
+                    f"{name:<20} {cache_size:>15} {results[0]:>12.1f} {results[1]:>10.1f}"
+                )
+            await session.rollback()
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--database", action="store_true")
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    compile_overhead(args.iterations)
+    if args.database:
+        asyncio.run(database_overhead(args.calls))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
@@ -0,0 +1,57 @@
+"""add book rating aggregates
+
+Revision ID: 0d5e9b3a7c18
+Revises: f3a8d61c2e94
+Create Date: 2026-10-18 16:45:09.127730
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '0d5e9b3a7c18'
+down_revision: Union[str, None] = 'f3a8d61c2e94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('books', sa.Column('review_count', sa.INTEGER(), server_default='0', nullable=False))
+    op.add_column('books', sa.Column('rating_sum', sa.INTEGER(), server_default='0', nullable=False))
+    op.add_column('books', sa.Column('rating_histogram', postgresql.ARRAY(sa.INTEGER()), server_default='{0,0,0,0,0}', nullable=False))
+
+    # Backfill from existing reviews
+    op.execute(
+        """
+        UPDATE books
+        SET review_count = agg.review_count,
+            rating_sum = agg.rating_sum,
+            rating_histogram = agg.rating_histogram
+        FROM (
+            SELECT book_uid,
+                   count(*) AS review_count,
+                   coalesce(sum(rating), 0) AS rating_sum,
+                   ARRAY[
+                       count(*) FILTER (WHERE rating = 0),
+                       count(*) FILTER (WHERE rating = 1),
+                       count(*) FILTER (WHERE rating = 2),
+                       count(*) FILTER (WHERE rating = 3),
+                       count(*) FILTER (WHERE rating = 4)
+                   ]::integer[] AS rating_histogram
+            FROM reviews
+            WHERE book_uid IS NOT NULL
+            GROUP BY book_uid
+        ) AS agg
+        WHERE books.uid = agg.book_uid
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('books', 'rating_histogram')
+    op.drop_column('books', 'rating_sum')
+    op.drop_column('books', 'review_count')
@@ -0,0 +1,51 @@
+"""add unique tag name index
+
+Revision ID: 5e0c7a94b2d1
+Revises: 9b41e6d2a7f3
+Create Date: 2026-10-18 15:07:52.903114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e0c7a94b2d1'
+down_revision: Union[str, None] = '9b41e6d2a7f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Concurrent tagging could create the same tag twice. Keep the oldest
+    # copy of each name and move the book links over to it.
+    op.execute(
+        """
+        CREATE TEMPORARY TABLE tag_duplicates ON COMMIT DROP AS
+        SELECT uid, first_value(uid) OVER (
+            PARTITION BY name ORDER BY created_at NULLS LAST, uid
+        ) AS keep_uid
+        FROM tags
+        """
+    )
+    op.execute("DELETE FROM tag_duplicates WHERE uid = keep_uid")
+    op.execute(
+        """
+        INSERT INTO booktag (book_id, tag_id)
+        SELECT booktag.book_id, tag_duplicates.keep_uid
+        FROM booktag JOIN tag_duplicates ON booktag.tag_id = tag_duplicates.uid
+        ON CONFLICT DO NOTHING
+        """
+    )
+    op.execute(
+        "DELETE FROM booktag USING tag_duplicates WHERE booktag.tag_id = tag_duplicates.uid"
+    )
+    op.execute("DELETE FROM tags USING tag_duplicates WHERE tags.uid = tag_duplicates.uid")
+    op.create_index('ix_tags_name', 'tags', ['name'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tags_name', table_name='tags')
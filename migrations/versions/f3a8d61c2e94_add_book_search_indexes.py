@@ -0,0 +1,44 @@
+"""add book search indexes
+
+Revision ID: f3a8d61c2e94
+Revises: c7e2b84f19a6
+Create Date: 2026-10-18 14:27:53.911046
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a8d61c2e94'
+down_revision: Union[str, None] = 'c7e2b84f19a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.add_column('books', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed(
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(author, '')), 'B') || "
+            "setweight(to_tsvector('english', coalesce(publisher, '')), 'C')",
+            persisted=True,
+        ),
+        nullable=True,
+    ))
+    op.create_index('ix_books_search_vector', 'books', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index('ix_books_title_trgm', 'books', ['title'], unique=False, postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'})
+    op.create_index('ix_books_author_trgm', 'books', ['author'], unique=False, postgresql_using='gin', postgresql_ops={'author': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('ix_books_author_trgm', table_name='books', postgresql_using='gin')
+    op.drop_index('ix_books_title_trgm', table_name='books', postgresql_using='gin')
+    op.drop_index('ix_books_search_vector', table_name='books', postgresql_using='gin')
+    op.drop_column('books', 'search_vector')
@@ -5,18 +5,29 @@ from .books.routes import book_router
 from .auth.routes import auth_router
 from .reviews.routes import review_router
 from .tags.routes import tags_router
+from .metrics import metrics_router
+from .auth.hashing import password_hasher
+from .access_log import access_log
 
 from .errors import register_all_errors
 from .middleware import register_middleware
 
-from src.db.postgres import init_db, close_db
+from src.db.postgres import init_db, close_db, replica_set
+from src.db.redis import token_blocklist
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    access_log.start()
     await init_db()
+    await replica_set.start()
+    await token_blocklist.start()
     yield
+    await token_blocklist.stop()
+    await replica_set.stop()
     await close_db()
+    password_hasher.shutdown()
+    access_log.stop()
 
 
 version = "v1"
@@ -35,3 +46,4 @@ app.include_router(auth_router, prefix=f"/api/{version}/auth", tags=["Auth"])
 app.include_router(book_router, prefix=f"/api/{version}/books", tags=["Books"])
 app.include_router(review_router, prefix=f"/api/{version}/reviews", tags=["Reviews"])
 app.include_router(tags_router, prefix=f"/api/{version}", tags=["Tags"])
+app.include_router(metrics_router, prefix=f"/api/{version}/metrics", tags=["Metrics"])
@@ -0,0 +1,137 @@
+import queue
+import random
+import threading
+from typing import Dict, Optional
+
+from loguru import logger
+
+from src.config import Config
+from src.metrics import register_metrics
+
+ACCESS_LOG_FORMAT = (
+    "{client} - {method} - {path} - {status} - completed after {duration_ms}ms "
+    "(sql {sql_count}/{sql_ms}ms, redis {redis_count}/{redis_ms}ms, hash {hash_ms}ms)"
+)
+# Format for requests whose handler raised, with the exception appended
+ACCESS_LOG_ERROR_FORMAT = ACCESS_LOG_FORMAT + " - {error}"
+
+# Queued to stop the writer thread
+_STOP = object()
+
+
+class AccessLog:
+    """
+    Access log whose records are written by a background thread, so request
+    handling never waits on the log sink.
+
+    Successful responses can be sampled, per route or globally, and are dropped
+    when `max_queue` records are already waiting. Error responses (4xx/5xx) are
+    never sampled or dropped. Dropped records are counted and reported by the
+    writer once it catches up.
+
+    Args:
+        max_queue (int): Maximum number of queued successful records
+        sample_rate (float): Fraction of successful responses to log
+        route_sample_rates (Dict[str, float]): Sample rates by route template
+    """
+
+    def __init__(
+        self,
+        max_queue: int,
+        sample_rate: float = 1.0,
+        route_sample_rates: Optional[Dict[str, float]] = None,
+    ) -> None:
+        self.max_queue = max_queue
+        self.sample_rate = sample_rate
+        self.route_sample_rates = route_sample_rates or {}
+        self.queued = 0
+        self.written = 0
+        self.sampled_out = 0
+        self.dropped = 0
+        self._reported_dropped = 0
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the writer thread if it is not running."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._write_loop, name="access-log", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Write the queued records and stop the writer thread."""
+        thread = self._thread
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+            self._thread = None
+
+    def log(self, record: dict) -> None:
+        """
+        Queue an access log record without blocking.
+
+        Args:
+            record (dict): Fields of `ACCESS_LOG_FORMAT` plus `route`, and
+                `error` when the handler raised
+        """
+        if record["status"] < 400:
+            rate = self.route_sample_rates.get(record["route"], self.sample_rate)
+            if rate < 1.0 and random.random() >= rate:
+                self.sampled_out += 1
+                return
+            if self._queue.qsize() >= self.max_queue:
+                self.dropped += 1
+                return
+
+        if self._thread is None:
+            self.start()
+        self.queued += 1
+        self._queue.put(record)
+
+    def _write_loop(self) -> None:
+        while True:
+            record = self._queue.get()
+            if record is _STOP:
+                self._report_dropped()
+                return
+            if "error" in record:
+                logger.error(ACCESS_LOG_ERROR_FORMAT, **record)
+            else:
+                logger.info(ACCESS_LOG_FORMAT, **record)
+            self.written += 1
+
+            # Once caught up, report what was dropped while the queue was full
+            if self._queue.empty():
+                self._report_dropped()
+
+    def _report_dropped(self) -> None:
+        dropped = self.dropped
+        if dropped != self._reported_dropped:
+            logger.warning(
+                "Access log dropped {count} records while the sink was behind",
+                count=dropped - self._reported_dropped,
+            )
+            self._reported_dropped = dropped
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_queue": self.max_queue,
+            "queued": self.queued,
+            "written": self.written,
+            "sampled_out": self.sampled_out,
+            "dropped": self.dropped,
+        }
+
+
+access_log = AccessLog(
+    max_queue=Config.ACCESS_LOG_MAX_QUEUE,
+    sample_rate=Config.ACCESS_LOG_SAMPLE_RATE,
+    route_sample_rates=Config.ACCESS_LOG_ROUTE_SAMPLE_RATES,
+)
+
+register_metrics("access_log", access_log.stats)
@@ -6,10 +6,9 @@ from typing import List
 
 from .utils import decode_token
 from .service import UserService
-from src.db.models import User
 
 from src.db.redis import token_in_blocklist
-from src.db.postgres import get_session
+from src.db.postgres import get_read_session, get_session
 from src.errors import (
     InvalidToken,
     RefreshTokenRequired,
@@ -57,15 +56,23 @@ class TokenBearer(HTTPBearer):
                 detail="Invalid authorization credentials",
             )
 
-        # Decode and validate token
+        # Decode and validate token once per request, even when several
+        # bearer dependencies are resolved for the same route
         token = credentials.credentials
-        token_data = decode_token(token)
+        if getattr(request.state, "token", None) == token:
+            token_data = request.state.token_data
+        else:
+            token_data = decode_token(token)
 
-        if await token_in_blocklist(token_data["jti"]):
-            raise InvalidToken()
+            if token_data is None:
+                raise InvalidToken()
+
+            if await token_in_blocklist(token_data["jti"]):
+                raise InvalidToken()
+
+            request.state.token = token
+            request.state.token_data = token_data
 
-        if token_data is None:
-            raise InvalidToken()
         # Perform token-specific validation
         self.verify_token_data(token_data)
         return token_data
@@ -124,24 +131,68 @@ class RefreshTokenBearer(TokenBearer):
             raise RefreshTokenRequired()
 
 
-async def get_current_user(
-    token_details: dict = Depends(AccessTokenBearer()),
-    session: AsyncSession = Depends(get_session),
+# Shared instance so FastAPI resolves it once per request across dependencies
+access_token_bearer = AccessTokenBearer()
+
+
+async def resolve_principal(
+    request: Request, token_details: dict, session: AsyncSession
 ):
+    """
+    Resolve a lean (uid, email, role) projection of the current user,
+    loading it at most once per request.
+    """
+    if hasattr(request.state, "principal"):
+        return request.state.principal
+
     user_email = token_details["user"]["email"]
+    principal = await user_service.get_user_principal(user_email, session)
+    request.state.principal = principal
 
-    user = await user_service.get_user_by_email(user_email, session)
+    return principal
 
-    return user
+
+async def get_current_principal(
+    request: Request,
+    token_details: dict = Depends(access_token_bearer),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Resolve the current user's principal on the route's primary session.
+    """
+    return await resolve_principal(request, token_details, session)
+
+
+async def get_current_read_principal(
+    request: Request,
+    token_details: dict = Depends(access_token_bearer),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """
+    Resolve the current user's principal on the route's read session, so
+    read-only routes don't also check out a primary connection.
+    """
+    return await resolve_principal(request, token_details, session)
 
 
 class Rolechecker:
     def __init__(self, allowed_roles: List[str]) -> None:
         self.allowed_roles = allowed_roles
 
-    async def __call__(self, current_user: User = Depends(get_current_user)):
+    async def __call__(self, current_user=Depends(get_current_principal)):
+        return self.check(current_user)
 
-        if current_user.role in self.allowed_roles:
+    def check(self, current_user) -> bool:
+        if current_user is not None and current_user.role in self.allowed_roles:
             return True
 
         raise InsufficientPermission()
+
+
+class ReadRolechecker(Rolechecker):
+    """
+    Role check for read-only routes, looking the user up on the read session.
+    """
+
+    async def __call__(self, current_user=Depends(get_current_read_principal)):
+        return self.check(current_user)
@@ -0,0 +1,119 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from src.config import Config
+from src.errors import PasswordHashingBusy
+from src.instrumentation import record_timing
+from src.metrics import LatencyStats, register_metrics
+from .utils import generate_password_hash, verify_and_update_password
+
+
+def _timed(func: Callable, *args) -> Tuple[Any, float]:
+    """Run `func` inside the worker and report how long the work itself took."""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification in a bounded worker pool so it never
+    blocks the event loop.
+
+    At most `max_pending` operations may be running or queued at once; further
+    calls are rejected with `PasswordHashingBusy` (503) instead of piling up.
+
+    Args:
+        executor_type (str): "thread" or "process"
+        max_workers (int): Number of pool workers
+        max_pending (int): Maximum running plus queued operations
+    """
+
+    def __init__(self, executor_type: str, max_workers: int, max_pending: int) -> None:
+        if executor_type not in ("thread", "process"):
+            raise ValueError(f"Unknown password hash executor: {executor_type}")
+
+        self.executor_type = executor_type
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self.wait_latency: Dict[str, LatencyStats] = {}
+        self.hash_latency: Dict[str, LatencyStats] = {}
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="password-hash"
+                )
+        return self._executor
+
+    async def _run(self, operation: str, func: Callable, *args) -> Any:
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordHashingBusy()
+
+        self.pending += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result, elapsed = await loop.run_in_executor(
+                self._get_executor(), _timed, func, *args
+            )
+        finally:
+            self.pending -= 1
+
+        total = time.perf_counter() - start
+        record_timing("hash", total)
+        self.hash_latency.setdefault(operation, LatencyStats()).observe(elapsed)
+        self.wait_latency.setdefault(operation, LatencyStats()).observe(
+            max(total - elapsed, 0.0)
+        )
+        return result
+
+    async def hash(self, password: str) -> str:
+        """Hash a password in the worker pool."""
+        return await self._run("hash", generate_password_hash, password)
+
+    async def verify_and_update(
+        self, password: str, hash: str
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a password in the worker pool, returning a replacement hash
+        when the stored one was made with a different cost factor.
+        """
+        return await self._run("verify", verify_and_update_password, password, hash)
+
+    def stats(self) -> dict:
+        """Return queue depth and latency metrics for this worker."""
+        return {
+            "executor": self.executor_type,
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "in_flight": self.pending,
+            "queue_depth": max(self.pending - self.max_workers, 0),
+            "rejected": self.rejected,
+            "hash_latency": {k: v.snapshot() for k, v in self.hash_latency.items()},
+            "wait_latency": {k: v.snapshot() for k, v in self.wait_latency.items()},
+        }
+
+    def shutdown(self) -> None:
+        """Stop the worker pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    executor_type=Config.PASSWORD_HASH_EXECUTOR,
+    max_workers=Config.PASSWORD_HASH_WORKERS,
+    max_pending=Config.PASSWORD_HASH_MAX_PENDING,
+)
+
+register_metrics("password_hashing", password_hasher.stats)
@@ -5,17 +5,19 @@ from sqlmodel.ext.asyncio.session import AsyncSession
 
 from .schemas import UserCreateModel, UserLoginModel, UserModel, UserBooksModel
 from .service import UserService
-from .utils import create_access_token, verify_password
+from .hashing import password_hasher
+from .utils import create_access_token
 from .dependencies import (
     RefreshTokenBearer,
     AccessTokenBearer,
-    get_current_user,
     Rolechecker,
 )
 
 from src.db.postgres import get_session
 from src.db.redis import add_jti_to_blocklist
 from src.errors import UserAlreadyExist, UserNotFound, InvalidToken
+from src.mail.messages import welcome_email
+from src.mail.queue import email_queue
 
 
 auth_router = APIRouter()
@@ -50,6 +52,9 @@ async def create_user_account(
     if user_exists:
         raise UserAlreadyExist()
     new_user = await user_service.create_user(user_data, session)
+
+    # Delivered by the mail worker, so SMTP never adds to signup latency
+    await email_queue.enqueue(welcome_email(new_user))
     return new_user
 
 
@@ -84,13 +89,20 @@ async def login_user(
     if not user:
         raise UserNotFound()
 
-    # Verify password
-    if not verify_password(password, user.password_hash):
+    # Verify password off the event loop
+    password_valid, new_hash = await password_hasher.verify_and_update(
+        password, user.password_hash
+    )
+    if not password_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect password",
         )
 
+    # Upgrade the stored hash if the bcrypt cost factor has changed
+    if new_hash:
+        await user_service.update_password_hash(user, new_hash, session)
+
     # Generate tokens
     token_data = {"email": user.email, "user_uid": str(user.uid), "role": user.role}
     access_token = create_access_token(user_data=token_data)
@@ -140,8 +152,16 @@ async def get_new_access_token(token_details: dict = Depends(RefreshTokenBearer(
 
 @auth_router.get("/me", response_model=UserBooksModel)
 async def get_current_user(
-    user=Depends(get_current_user), _: bool = Depends(role_checker)
+    token_details: dict = Depends(AccessTokenBearer()),
+    session: AsyncSession = Depends(get_session),
+    _: bool = Depends(role_checker),
 ):
+    user = await user_service.get_user_with_library(
+        token_details["user"]["email"], session
+    )
+
+    if not user:
+        raise UserNotFound()
 
     return user
 
@@ -1,34 +1,77 @@
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel import select
-from sqlalchemy.exc import NoResultFound
+from sqlalchemy import bindparam
+from sqlalchemy.exc import IntegrityError, NoResultFound
+from sqlalchemy.orm import selectinload
 
 from src.db.models import User
+from src.db.statements import CachedStatement
+from src.errors import UserAlreadyExist
 from .schemas import UserCreateModel
-from .utils import generate_password_hash, verify_password
+from .hashing import password_hasher
+
+
+# Loader options for responses that embed the user's books and reviews
+USER_LIBRARY_LOADERS = (selectinload(User.books), selectinload(User.reviews))
+
+USER_BY_EMAIL = CachedStatement(select(User).where(User.email == bindparam("email")))
+# Authorization runs on every authenticated request
+USER_PRINCIPAL_BY_EMAIL = CachedStatement(
+    select(User.uid, User.email, User.role).where(User.email == bindparam("email"))
+)
 
 
 class UserService:
-    async def get_user_by_email(self, email: str, session: AsyncSession):
+    async def get_user_by_email(self, email: str, session: AsyncSession, options=()):
         try:
-            statement = select(User).where(User.email == email)
-            result = await session.exec(statement)
+            statement = USER_BY_EMAIL.with_options(options)
+            result = await session.exec(statement, params={"email": email})
             user = result.one()
             return user
         except NoResultFound:
             return None
 
+    async def get_user_principal(self, email: str, session: AsyncSession):
+        """
+        Load only the columns needed for authorization (uid, email, role)
+        without touching any of the user's relationships.
+        """
+        result = await session.exec(
+            USER_PRINCIPAL_BY_EMAIL.statement, params={"email": email}
+        )
+        return result.first()
+
+    async def get_user_with_library(self, email: str, session: AsyncSession):
+        return await self.get_user_by_email(
+            email, session, options=USER_LIBRARY_LOADERS
+        )
+
     async def user_exists(self, email, session: AsyncSession):
-        user = await self.get_user_by_email(email, session)
+        statement = select(User.uid).where(User.email == email)
+        result = await session.exec(statement)
 
-        return True if user is not None else False
+        return True if result.first() is not None else False
 
     async def create_user(self, user_data: UserCreateModel, session: AsyncSession):
         user_data_dict = user_data.model_dump()
 
         new_user = User(**user_data_dict)
-        new_user.password_hash = generate_password_hash(user_data_dict["password"])
+        new_user.password_hash = await password_hasher.hash(user_data_dict["password"])
         new_user.role = "user"
         session.add(new_user)
-        await session.commit()
+        try:
+            await session.commit()
+        except IntegrityError:
+            # A concurrent signup took the email after the caller checked it
+            await session.rollback()
+            raise UserAlreadyExist()
         # await session.refresh(new_user)
         return new_user
+
+    async def update_password_hash(
+        self, user: User, password_hash: str, session: AsyncSession
+    ):
+        user.password_hash = password_hash
+        session.add(user)
+        await session.commit()
+        return user
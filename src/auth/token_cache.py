@@ -0,0 +1,87 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from src.config import Config
+from src.metrics import register_metrics
+
+
+class TokenCache:
+    """
+    Bounded in-process LRU of verified JWT claims, keyed by token digest.
+
+    Entries expire `leeway` seconds before the token's own `exp`, so a cached
+    token is never accepted after the signature check would have failed.
+    Revocation is not handled here; callers still check the blocklist.
+
+    Args:
+        maxsize (int): Maximum number of cached tokens, 0 disables the cache
+        leeway (int): Seconds subtracted from `exp` when computing expiry
+    """
+
+    def __init__(self, maxsize: int, leeway: int = 0) -> None:
+        self.maxsize = maxsize
+        self.leeway = leeway
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached claims for `token`, if still valid."""
+        if not self.maxsize:
+            return None
+
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, claims = entry
+        if time.time() >= expires_at:
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(claims)
+
+    def put(self, token: str, claims: Dict[str, Any]) -> None:
+        """Cache verified claims until the token's expiry minus the leeway."""
+        if not self.maxsize or "exp" not in claims:
+            return
+
+        expires_at = claims["exp"] - self.leeway
+        if time.time() >= expires_at:
+            return
+
+        key = self._key(token)
+        self._entries[key] = (expires_at, dict(claims))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# Leeway in seconds applied to token expiry checks for clock skew
+TOKEN_LEEWAY = 1
+
+token_cache = TokenCache(maxsize=Config.JWT_CACHE_SIZE, leeway=TOKEN_LEEWAY)
+
+register_metrics("token_cache", token_cache.stats)
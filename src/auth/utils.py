@@ -1,19 +1,28 @@
 import uuid
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from loguru import logger
 from datetime import timedelta, datetime, timezone
 from passlib.context import CryptContext
 from src.config import Config
+from src.db.redis import token_in_blocklist
 import jwt
-from fastapi import HTTPException, status
+from fastapi import HTTPException, Request, status
+
+from .token_cache import token_cache, TOKEN_LEEWAY
 
 
 # Constants
 ACCESS_TOKEN_EXPIRY = 3600  # Default token expiry time in seconds (1 hour)
 MIN_PASSWORD_LENGTH = 8  # Minimum required password length
 
-# Initialize password hashing context with bcrypt scheme
-password_context = CryptContext(schemes=["bcrypt"])
+# Initialize password hashing context with bcrypt scheme. Pinning the
+# min/max rounds makes hashes with any other cost factor "need update".
+password_context = CryptContext(
+    schemes=["bcrypt"],
+    bcrypt__rounds=Config.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=Config.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=Config.BCRYPT_ROUNDS,
+)
 
 
 def generate_password_hash(password: str) -> str:
@@ -63,6 +72,28 @@ def verify_password(password: str, hash: str) -> bool:
         return False
 
 
+def verify_and_update_password(password: str, hash: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and rehash it if its hash uses an outdated cost factor.
+
+    Args:
+        password (str): The plain text password to verify
+        hash (str): The hashed password to compare against
+
+    Returns:
+        Tuple[bool, Optional[str]]: Whether the password matches, and a new hash
+            to store when the existing one needs to be upgraded
+    """
+    if not password or not hash:
+        return False, None
+
+    try:
+        return password_context.verify_and_update(password, hash)
+    except Exception as e:
+        logger.error(f"Error verifying password: {str(e)}")
+        return False, None
+
+
 def create_access_token(
     user_data: Dict[str, Any], expiry: Optional[timedelta] = None, refresh: bool = False
 ) -> str:
@@ -111,6 +142,9 @@ def decode_token(token: str) -> Dict[str, Any]:
     """
     Decode and validate a JWT token.
 
+    Verified claims are kept in an in-process cache until the token expires,
+    so repeated requests with the same token skip the signature check.
+
     Args:
         token (str): The JWT token to decode and validate
 
@@ -125,14 +159,19 @@ def decode_token(token: str) -> Dict[str, Any]:
             status_code=status.HTTP_403_FORBIDDEN, detail="Token is required"
         )
 
+    token_data = token_cache.get(token)
+    if token_data is not None:
+        return token_data
+
     try:
-        # Add leeway of 1 second for clock skew
+        # Add leeway for clock skew
         token_data = jwt.decode(
             jwt=token,
             key=Config.JWT_SECRET,
             algorithms=[Config.JWT_ALGORITHM],
-            leeway=1,
+            leeway=TOKEN_LEEWAY,
         )
+        token_cache.put(token, token_data)
         return token_data
 
     except jwt.ExpiredSignatureError:
@@ -152,3 +191,37 @@ def decode_token(token: str) -> Dict[str, Any]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Token decoding failed"
         )
+
+
+def client_identity(request: Request) -> Tuple[str, str]:
+    """
+    Identify a request by its client address, as an anonymous caller.
+
+    Returns:
+        Tuple[str, str]: "anonymous" and an identity such as "ip:<address>"
+    """
+    host = request.client.host if request.client else "-"
+    return "anonymous", f"ip:{host}"
+
+
+async def request_identity(request: Request) -> Tuple[str, str]:
+    """
+    Identify who made a request: the user of a valid access token, otherwise
+    the client address as an anonymous caller. Revoked tokens count as
+    anonymous.
+
+    Returns:
+        Tuple[str, str]: The role and an identity such as "user:<uid>" or
+        "ip:<address>"
+    """
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            token_data = decode_token(token)
+            user = token_data["user"]
+            if not await token_in_blocklist(token_data["jti"]):
+                return user["role"], f"user:{user['user_uid']}"
+        except (HTTPException, KeyError, TypeError):
+            pass
+    return client_identity(request)
@@ -0,0 +1,127 @@
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Dict, List, Sequence, Tuple, Union
+
+# Content types accepted by the bulk import endpoint
+NDJSON_CONTENT_TYPES = (
+    "application/x-ndjson",
+    "application/jsonl",
+    "application/json-seq",
+)
+CSV_CONTENT_TYPES = ("text/csv", "application/csv")
+
+
+class RowParseError(ValueError):
+    """A line of the uploaded file could not be parsed into a row"""
+
+    pass
+
+
+def decode_line(line: bytes) -> Union[str, RowParseError]:
+    try:
+        return line.decode("utf-8").rstrip("\r")
+    except UnicodeDecodeError as e:
+        return RowParseError(f"Invalid UTF-8 at byte {e.start}: {e.reason}")
+
+
+async def iter_lines(
+    stream: AsyncIterator[bytes],
+) -> AsyncIterator[Tuple[int, Union[str, RowParseError]]]:
+    """
+    Split a streamed request body into numbered text lines, holding at most
+    one partial line in memory between chunks. A line that is not valid
+    UTF-8 is yielded as a RowParseError.
+    """
+    buffer = b""
+    line_no = 0
+    async for chunk in stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            yield line_no, decode_line(line)
+    if buffer:
+        yield line_no + 1, decode_line(buffer)
+
+
+async def iter_ndjson_rows(
+    stream: AsyncIterator[bytes],
+) -> AsyncIterator[Tuple[int, Any]]:
+    """Yield (line number, parsed object or RowParseError) for each NDJSON line."""
+    async for line_no, line in iter_lines(stream):
+        if isinstance(line, RowParseError):
+            yield line_no, line
+            continue
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, RowParseError(f"Invalid JSON: {e.msg}")
+
+
+async def iter_csv_rows(
+    stream: AsyncIterator[bytes],
+) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Yield (line number, row dict or RowParseError) for each CSV record.
+    The first record is the header. Quoted fields may span several lines;
+    a record is reported with the number of the line it starts on.
+    """
+    header = None
+    record = ""
+    record_line_no = 0
+    async for line_no, line in iter_lines(stream):
+        if isinstance(line, RowParseError):
+            # Drop the record the line belongs to, reported where it starts
+            yield (record_line_no if record else line_no), line
+            record = ""
+            continue
+        if not record:
+            if not line.strip():
+                continue
+            record_line_no = line_no
+            record = line
+        else:
+            record += "\n" + line
+
+        # Keep reading while a quoted field is still open
+        if record.count('"') % 2:
+            continue
+
+        values = next(csv.reader([record]))
+        record = ""
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+
+        if len(values) != len(header):
+            yield record_line_no, RowParseError(
+                f"Expected {len(header)} columns, got {len(values)}"
+            )
+            continue
+        row: Dict[str, str] = dict(zip(header, values))
+        yield record_line_no, row
+
+    if record:
+        yield record_line_no, RowParseError("Unterminated quoted field")
+
+
+def encode_ndjson(rows: Sequence[Dict[str, Any]]) -> str:
+    """Encode JSON-ready rows as newline-delimited JSON."""
+    return "".join(json.dumps(row) + "\n" for row in rows)
+
+
+def encode_csv(rows: Sequence[Dict[str, Any]], fieldnames: List[str]) -> str:
+    """Encode JSON-ready rows as CSV records without a header."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, lineterminator="\n")
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def encode_csv_header(fieldnames: List[str]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerow(fieldnames)
+    return buffer.getvalue()
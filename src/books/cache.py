@@ -0,0 +1,197 @@
+import asyncio
+import json
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+import redis.asyncio as redis
+from loguru import logger
+
+from src.config import Config
+from src.db.redis import redis_client
+from src.metrics import register_metrics
+
+# Bump the version whenever the shape of BookDetailModel changes
+BOOK_DETAIL_PREFIX = "book:detail:v3:"
+
+# How long a worker may hold the rebuild lock for a key (milliseconds)
+LOCK_TIMEOUT_MS = 5000
+# How long other workers poll for the rebuilt value before loading it themselves
+LOCK_WAIT_INTERVAL = 0.05
+LOCK_WAIT_ATTEMPTS = 20
+
+
+class BookCache:
+    """
+    Read-through Redis cache for serialized book detail payloads.
+
+    Concurrent misses for the same key are collapsed twice: coroutines in this
+    worker share a single in-flight load, and workers coordinate through a
+    short-lived Redis lock so only one of them rebuilds the entry.
+    Redis errors are logged and treated as misses so the database stays the
+    source of truth.
+
+    Entries may be rebuilt from a read replica that has not yet replayed the
+    write that invalidated them, so invalidations are repeated once replicas
+    are guaranteed to have caught up.
+
+    Args:
+        client (redis.Redis): Async Redis client
+        ttl (int): Time to live of cached entries in seconds
+        replica_lag (float): Most seconds a replica may lag behind, 0 without
+            replicas
+    """
+
+    def __init__(self, client: redis.Redis, ttl: int, replica_lag: float = 0) -> None:
+        self.client = client
+        self.ttl = ttl
+        self.replica_lag = replica_lag
+        self._pending_invalidations: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _key(self, book_uid: Any) -> str:
+        return f"{BOOK_DETAIL_PREFIX}{book_uid}"
+
+    async def _get(self, key: str) -> Optional[dict]:
+        try:
+            cached = await self.client.get(key)
+        except redis.RedisError as e:
+            self.errors += 1
+            logger.warning(f"Book cache read failed for {key}: {e}")
+            return None
+        return json.loads(cached) if cached is not None else None
+
+    async def _set(self, key: str, payload: dict) -> None:
+        try:
+            await self.client.set(key, json.dumps(payload), ex=self.ttl)
+        except redis.RedisError as e:
+            self.errors += 1
+            logger.warning(f"Book cache write failed for {key}: {e}")
+
+    async def get_or_load(
+        self, book_uid: Any, loader: Callable[[], Awaitable[Optional[dict]]]
+    ) -> Optional[dict]:
+        """
+        Return the cached payload for a book, calling `loader` on a miss.
+
+        Args:
+            book_uid: The book's uid
+            loader: Coroutine function returning the JSON-ready payload,
+                or None when the book does not exist (which is not cached)
+
+        Returns:
+            Optional[dict]: The book detail payload
+        """
+        key = self._key(book_uid)
+
+        cached = await self._get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            payload = await self._load_with_lock(key, loader)
+            future.set_result(payload)
+            return payload
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else is waiting
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def _load_with_lock(
+        self, key: str, loader: Callable[[], Awaitable[Optional[dict]]]
+    ) -> Optional[dict]:
+        lock_key = f"{key}:lock"
+        lock_token = uuid.uuid4().hex
+
+        try:
+            acquired = await self.client.set(
+                lock_key, lock_token, nx=True, px=LOCK_TIMEOUT_MS
+            )
+        except redis.RedisError as e:
+            self.errors += 1
+            logger.warning(f"Book cache lock failed for {key}: {e}")
+            acquired = False
+        else:
+            if not acquired:
+                # Another worker is rebuilding this entry, give it a chance
+                for _ in range(LOCK_WAIT_ATTEMPTS):
+                    await asyncio.sleep(LOCK_WAIT_INTERVAL)
+                    cached = await self._get(key)
+                    if cached is not None:
+                        return cached
+
+        try:
+            payload = await loader()
+            if payload is not None:
+                await self._set(key, payload)
+            return payload
+        finally:
+            if acquired:
+                try:
+                    # Only release the lock if it has not expired and been taken over
+                    if await self.client.get(lock_key) == lock_token:
+                        await self.client.delete(lock_key)
+                except redis.RedisError as e:
+                    self.errors += 1
+                    logger.warning(f"Book cache unlock failed for {key}: {e}")
+
+    async def invalidate(self, book_uid: Any) -> None:
+        """
+        Drop the cached payload for a book after it has been written to.
+        """
+        key = self._key(book_uid)
+        await self._delete(key)
+
+        if self.replica_lag > 0:
+            task = asyncio.create_task(self._delete(key, delay=self.replica_lag))
+            self._pending_invalidations.add(task)
+            task.add_done_callback(self._pending_invalidations.discard)
+
+    async def _delete(self, key: str, delay: float = 0) -> None:
+        if delay:
+            await asyncio.sleep(delay)
+        try:
+            await self.client.delete(key)
+        except redis.RedisError as e:
+            self.errors += 1
+            logger.warning(f"Book cache invalidation failed for {key}: {e}")
+
+    def stats(self) -> dict:
+        """
+        Return hit/miss counters for this worker.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "ttl": self.ttl,
+        }
+
+
+book_cache = BookCache(
+    redis_client,
+    ttl=Config.BOOK_CACHE_TTL,
+    replica_lag=(
+        Config.DB_REPLICA_MAX_LAG + Config.DB_REPLICA_HEALTH_INTERVAL
+        if Config.DATABASE_REPLICA_URLS
+        else 0
+    ),
+)
+
+register_metrics("book_cache", book_cache.stats)
@@ -0,0 +1,25 @@
+"""
+Recompute the denormalized rating aggregates on every book from its reviews.
+
+Usage:
+    python -m src.books.reconcile
+"""
+
+import asyncio
+
+from loguru import logger
+
+from src.db.postgres import SessionFactory, async_engine
+from .service import BookService
+
+
+async def reconcile_rating_aggregates() -> int:
+    async with SessionFactory() as session:
+        fixed = await BookService().reconcile_rating_aggregates(session)
+    logger.info(f"Reconciled rating aggregates, {fixed} books corrected")
+    await async_engine.dispose()
+    return fixed
+
+
+if __name__ == "__main__":
+    asyncio.run(reconcile_rating_aggregates())
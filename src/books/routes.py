@@ -1,57 +1,224 @@
+from datetime import datetime
+from enum import Enum
 from uuid import UUID
-from fastapi import APIRouter, Depends, status, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, Query, Request, Response, status, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from typing import Optional
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from .cache import BOOK_DETAIL_PREFIX
 from .service import BookService
-from .schemas import BookCreateModel, BookModel, BookUpdateModel, BookDetailModel
+from .schemas import (
+    BookCreateModel,
+    BookModel,
+    BookUpdateModel,
+    BookDetailModel,
+    BookPageModel,
+    BookImportResultModel,
+    BookSearchPageModel,
+)
+from .bulk import (
+    CSV_CONTENT_TYPES,
+    NDJSON_CONTENT_TYPES,
+    encode_csv,
+    encode_csv_header,
+    encode_ndjson,
+    iter_csv_rows,
+    iter_ndjson_rows,
+)
 
-from src.db.postgres import get_session
-from src.auth.dependencies import AccessTokenBearer, Rolechecker
+from src.db.postgres import SessionFactory, get_read_session, get_session
+from src.auth.dependencies import AccessTokenBearer, ReadRolechecker, Rolechecker
+from src.conditional import (
+    is_conditional,
+    is_not_modified,
+    make_etag,
+    make_page_etag,
+    not_modified_response,
+    validator_headers,
+)
 from src.errors import BookNotFound
+from src.responses import TypedJSONResponse
+from src.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, MAX_SEARCH_OFFSET
 
 
 book_router = APIRouter()
 book_service = BookService()
 access_token_bearer = AccessTokenBearer()
 role_checker = Depends(Rolechecker(["user"]))
+read_role_checker = Depends(ReadRolechecker(["user"]))
 
+BOOK_PAGE_ADAPTER = TypeAdapter(BookPageModel)
 
-@book_router.get("", response_model=List[BookModel], dependencies=[role_checker])
+
+@book_router.get("", response_model=BookPageModel, dependencies=[read_role_checker])
 async def get_all_books(
-    session: AsyncSession = Depends(get_session),
+    request: Request,
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_read_session),
     token_details: dict = Depends(access_token_bearer),
 ):
-    books = await book_service.get_all_books(session)
-    return books
+    books = await book_service.get_all_books(session, limit=limit, cursor=cursor)
+    headers = validator_headers(
+        make_page_etag("books", books["items"], limit, cursor, books["next_cursor"])
+    )
+    if is_not_modified(request, headers["ETag"]):
+        return not_modified_response(headers)
+
+    return TypedJSONResponse(books, BOOK_PAGE_ADAPTER, headers=headers)
 
 
 @book_router.get(
-    "/user/{user_uid}", response_model=List[BookModel], dependencies=[role_checker]
+    "/user/{user_uid}", response_model=BookPageModel, dependencies=[read_role_checker]
 )
 async def get_user_book_submissions(
     user_uid: UUID,
+    request: Request,
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_read_session),
+    token_details: dict = Depends(access_token_bearer),
+):
+    books = await book_service.get_user_books(
+        user_uid, session, limit=limit, cursor=cursor
+    )
+    headers = validator_headers(
+        make_page_etag(
+            "user-books", books["items"], user_uid, limit, cursor, books["next_cursor"]
+        )
+    )
+    if is_not_modified(request, headers["ETag"]):
+        return not_modified_response(headers)
+
+    return TypedJSONResponse(books, BOOK_PAGE_ADAPTER, headers=headers)
+
+
+@book_router.get(
+    "/search", response_model=BookSearchPageModel, dependencies=[role_checker]
+)
+async def search_books(
+    request: Request,
+    response: Response,
+    q: str = Query(min_length=1, max_length=200),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(default=0, ge=0, le=MAX_SEARCH_OFFSET),
     session: AsyncSession = Depends(get_session),
     token_details: dict = Depends(access_token_bearer),
 ):
+    results = await book_service.search_books(q, session, limit=limit, offset=offset)
+    headers = validator_headers(
+        make_page_etag(
+            "search", results["items"], q, limit, offset, results["next_offset"]
+        )
+    )
+    if is_not_modified(request, headers["ETag"]):
+        return not_modified_response(headers)
+
+    response.headers.update(headers)
+    return results
+
 
-    books = await book_service.get_user_books(user_uid, session)
-    return books
+def to_stored_time(value: Optional[datetime]) -> Optional[datetime]:
+    """Convert a timezone-aware query parameter to the naive local time books store."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone().replace(tzinfo=None)
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+@book_router.get("/export", dependencies=[role_checker])
+async def export_books(
+    format: ExportFormat = ExportFormat.ndjson,
+    created_since: Optional[datetime] = None,
+    updated_since: Optional[datetime] = None,
+    token_details: dict = Depends(access_token_bearer),
+):
+    """
+    Stream the catalog as NDJSON or CSV, optionally only the books created or
+    updated at or after a watermark. Memory use does not depend on catalog size.
+    """
+    fieldnames = list(BookModel.model_fields) + list(BookModel.model_computed_fields)
+
+    # The request-scoped session is closed before a streaming body is sent,
+    # so the export holds its own session for the cursor's lifetime. The
+    # first batch is read before responding, so a failing query still
+    # becomes an error response rather than a truncated 200.
+    session = SessionFactory()
+    batches = book_service.stream_books(
+        session,
+        created_since=to_stored_time(created_since),
+        updated_since=to_stored_time(updated_since),
+    )
+    try:
+        first = await batches.__anext__()
+    except StopAsyncIteration:
+        first = None
+    except BaseException:
+        await session.close()
+        raise
+
+    def encode(rows) -> str:
+        books = [BookModel.model_validate(row).model_dump(mode="json") for row in rows]
+        if format == ExportFormat.csv:
+            return encode_csv(books, fieldnames)
+        return encode_ndjson(books)
+
+    async def generate():
+        try:
+            if format == ExportFormat.csv:
+                yield encode_csv_header(fieldnames)
+            if first is not None:
+                yield encode(first)
+                async for rows in batches:
+                    yield encode(rows)
+        finally:
+            await batches.aclose()
+            await session.close()
+
+    media_type = "text/csv" if format == ExportFormat.csv else "application/x-ndjson"
+    return StreamingResponse(generate(), media_type=media_type)
 
 
 @book_router.get(
-    "/{book_uid}", response_model=BookDetailModel, dependencies=[role_checker]
+    "/{book_uid}", response_model=BookDetailModel, dependencies=[read_role_checker]
 )
 async def get_book(
     book_uid: UUID,
-    session: AsyncSession = Depends(get_session),
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_read_session),
     token_details: dict = Depends(access_token_bearer),
 ):
-    book = await book_service.get_book(book_uid, session)
+    # Revalidation only reads updated_at, so a 304 never touches the cache
+    # or serializes the book. Unconditional requests take the ETag from the
+    # cached payload instead, keeping cache hits free of SQL.
+    if is_conditional(request):
+        updated_at = await book_service.get_book_updated_at(book_uid, session)
+        if updated_at is None:
+            raise BookNotFound()
+        headers = validator_headers(
+            make_etag(BOOK_DETAIL_PREFIX, book_uid, updated_at), updated_at
+        )
+        if is_not_modified(request, headers["ETag"], updated_at):
+            return not_modified_response(headers)
+
+    book = await book_service.get_book_detail(book_uid, session)
 
     if not book:
         raise BookNotFound()
 
+    updated_at = datetime.fromisoformat(book["updated_at"])
+    response.headers.update(
+        validator_headers(
+            make_etag(BOOK_DETAIL_PREFIX, book_uid, updated_at), updated_at
+        )
+    )
     return book
 
 
@@ -74,9 +241,38 @@ async def create_a_book(
     return new_book
 
 
-@book_router.patch(
-    "/{book_uid}", response_model=BookUpdateModel, dependencies=[role_checker]
+@book_router.post(
+    "/bulk",
+    response_model=BookImportResultModel,
+    dependencies=[role_checker],
 )
+async def bulk_import_books(
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+    token_details: dict = Depends(access_token_bearer),
+):
+    """
+    Import books from an NDJSON or CSV request body, streamed and written in
+    batches. Returns the number of inserted rows and a per-line error report.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+
+    if content_type in NDJSON_CONTENT_TYPES:
+        rows = iter_ndjson_rows(request.stream())
+    elif content_type in CSV_CONTENT_TYPES:
+        rows = iter_csv_rows(request.stream())
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Upload books as application/x-ndjson or text/csv",
+        )
+
+    user_id = token_details.get("user")["user_uid"]
+    report = await book_service.bulk_create_books(rows, user_id, session)
+    return report
+
+
+@book_router.patch("/{book_uid}", response_model=BookModel, dependencies=[role_checker])
 async def update_book(
     book_uid: UUID,
     book_update_data: BookUpdateModel,
@@ -1,8 +1,10 @@
 import uuid
 
-from typing import List
+from typing import Any, List, Optional
 from datetime import date, datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, computed_field
+
+from src.reviews.schemas import ReviewModel
 
 
 class BookModel(BaseModel):
@@ -15,13 +17,34 @@ class BookModel(BaseModel):
     language: str
     created_at: datetime
     updated_at: datetime
+    review_count: int = 0
+    rating_sum: int = 0
+    rating_histogram: List[int] = []
+
+    @computed_field
+    @property
+    def average_rating(self) -> Optional[float]:
+        if not self.review_count:
+            return None
+        return round(self.rating_sum / self.review_count, 2)
 
     class Config:
         from_attributes = True
 
 
+class BookPageModel(BaseModel):
+    items: List[BookModel]
+    next_cursor: Optional[str] = None
+
+
+class BookSearchPageModel(BaseModel):
+    items: List[BookModel]
+    next_offset: Optional[int] = None
+
+
 class BookDetailModel(BookModel):
-    reviews: List
+    reviews: List[ReviewModel]
+    reviews_next_cursor: Optional[str] = None
     tags: List
 
 
@@ -37,13 +60,26 @@ class BookCreateModel(BaseModel):
         from_attributes = True
 
 
+# PATCH body: fields left out keep their current values
 class BookUpdateModel(BaseModel):
-    title: str
-    author: str
-    publisher: str
-    published_date: date
-    page_count: int
-    language: str
+    title: Optional[str] = None
+    author: Optional[str] = None
+    publisher: Optional[str] = None
+    published_date: Optional[date] = None
+    page_count: Optional[int] = None
+    language: Optional[str] = None
 
     class Config:
         from_attributes = True
+
+
+class BookImportErrorModel(BaseModel):
+    line: int
+    errors: List[Any]
+
+
+class BookImportResultModel(BaseModel):
+    inserted: int
+    failed: int
+    errors: List[BookImportErrorModel]
+    errors_truncated: bool = False
@@ -1,57 +1,427 @@
 from datetime import datetime
+from typing import Any, AsyncIterator, List, Optional, Tuple
 
+from pydantic import ValidationError
+from sqlalchemy import Integer, bindparam, cast, func, insert, or_, update
+from sqlalchemy.dialects.postgresql import REGCONFIG, array as pg_array
 from sqlalchemy.ext.asyncio.session import AsyncSession
-from sqlmodel import select, desc
-from sqlalchemy.exc import NoResultFound
+from sqlmodel import select
+from sqlalchemy.exc import NoResultFound, SQLAlchemyError
+from sqlalchemy.orm import selectinload
 
-from src.db.models import Book
-from .schemas import BookCreateModel, BookUpdateModel
+from src.db.models import BOOK_SEARCH_CONFIG, RATING_BUCKETS, Book, Review
+from src.db.statements import CachedStatement
+from src.pagination import DEFAULT_PAGE_SIZE, keyset_paginate
+from .cache import book_cache
+from src.config import Config
+from .bulk import RowParseError
+from .schemas import BookCreateModel, BookUpdateModel, BookDetailModel, BookModel
+
+# Loader options for responses that embed a book's tags; reviews are paged
+BOOK_DETAIL_LOADERS = (selectinload(Book.tags),)
+
+BOOK_BY_UID = CachedStatement(select(Book).where(Book.uid == bindparam("book_uid")))
+
+
+# Books locked and recounted per transaction when reconciling ratings
+RECONCILE_BATCH_SIZE = 1000
+
+
+def rating_aggregates(book_uids: Optional[List[Any]] = None):
+    """
+    Subquery of the rating aggregates each book should have, computed from
+    its reviews, optionally limited to `book_uids`.
+    """
+    aggregates = select(
+        Review.book_uid.label("book_uid"),
+        func.count().label("review_count"),
+        func.coalesce(func.sum(Review.rating), 0).label("rating_sum"),
+        pg_array(
+            [
+                cast(func.count().filter(Review.rating == rating), Integer)
+                for rating in range(RATING_BUCKETS)
+            ]
+        ).label("rating_histogram"),
+    ).where(Review.book_uid.is_not(None))
+    if book_uids is not None:
+        aggregates = aggregates.where(Review.book_uid.in_(book_uids))
+    aggregates = aggregates.group_by(Review.book_uid).subquery()
+
+    review_count = func.coalesce(aggregates.c.review_count, 0)
+    rating_sum = func.coalesce(aggregates.c.rating_sum, 0)
+    rating_histogram = func.coalesce(
+        aggregates.c.rating_histogram,
+        cast(pg_array([0] * RATING_BUCKETS), Book.rating_histogram.type),
+    )
+    expected = select(
+        Book.uid.label("uid"),
+        review_count.label("review_count"),
+        rating_sum.label("rating_sum"),
+        rating_histogram.label("rating_histogram"),
+    ).outerjoin(aggregates, aggregates.c.book_uid == Book.uid)
+    if book_uids is not None:
+        expected = expected.where(Book.uid.in_(book_uids))
+    return expected.subquery()
+
+
+def rating_drifted(expected):
+    """Whether a book's stored rating aggregates differ from `expected`."""
+    return or_(
+        Book.review_count != expected.c.review_count,
+        Book.rating_sum != expected.c.rating_sum,
+        Book.rating_histogram != expected.c.rating_histogram,
+    )
 
 
 class BookService:
-    async def get_all_books(self, session: AsyncSession):
-        statement = select(Book).order_by(desc(Book.created_at))
+    async def get_all_books(
+        self,
+        session: AsyncSession,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ):
+        statement = select(Book)
+        return await keyset_paginate(
+            session, statement, Book.created_at, Book.uid, limit, cursor
+        )
+
+    async def search_books(
+        self, query: str, session: AsyncSession, limit: int, offset: int = 0
+    ):
+        """
+        Rank books matching `query` on title, author and publisher.
+
+        Whole words are matched against the weighted `search_vector` (GIN),
+        and title/author prefixes and typos through the trigram indexes.
+        Only the columns of `BookModel` are selected.
+        """
+        ts_query = func.websearch_to_tsquery(cast(BOOK_SEARCH_CONFIG, REGCONFIG), query)
+        search_vector = Book.__table__.c.search_vector
+        rank = func.ts_rank_cd(search_vector, ts_query) + func.similarity(
+            Book.title, query
+        )
+
+        columns = [getattr(Book, name) for name in BookModel.model_fields]
+        statement = (
+            select(*columns)
+            .where(
+                or_(
+                    search_vector.op("@@")(ts_query),
+                    Book.title.op("%")(query),
+                    Book.title.istartswith(query, autoescape=True),
+                    Book.author.istartswith(query, autoescape=True),
+                )
+            )
+            .order_by(rank.desc(), Book.uid)
+            .offset(offset)
+            .limit(limit + 1)
+        )
+        result = await session.exec(statement)
+        rows = result.all()
+
+        next_offset = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_offset = offset + limit
+
+        return {"items": rows, "next_offset": next_offset}
+
+    async def get_book_updated_at(
+        self, book_uid: str, session: AsyncSession
+    ) -> Optional[datetime]:
+        """Return only a book's `updated_at`, or None if it does not exist."""
+        statement = select(Book.updated_at).where(Book.uid == book_uid)
         result = await session.exec(statement)
-        return result.all()
+        return result.first()
 
-    async def get_book(self, book_uid: str, session: AsyncSession):
+    async def get_book(self, book_uid: str, session: AsyncSession, options=()):
         try:
-            statement = select(Book).where(Book.uid == book_uid)
-            result = await session.exec(statement)
+            statement = BOOK_BY_UID.with_options(options)
+            result = await session.exec(statement, params={"book_uid": book_uid})
             book = result.one()
             return book
         except NoResultFound:
             return None
 
+    async def get_book_reviews(
+        self,
+        book_uid: str,
+        session: AsyncSession,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ):
+        statement = select(Review).where(Review.book_uid == book_uid)
+        return await keyset_paginate(
+            session, statement, Review.created_at, Review.uid, limit, cursor
+        )
+
+    async def get_book_detail(self, book_uid: str, session: AsyncSession):
+        """
+        Return the serialized detail payload of a book, served from the
+        Redis cache when possible.
+
+        Only the newest `BOOK_DETAIL_REVIEW_COUNT` reviews are embedded, with
+        a cursor for `GET /reviews/book/{book_uid}` to fetch the rest.
+        """
+
+        async def load_book_detail():
+            book = await self.get_book(book_uid, session, options=BOOK_DETAIL_LOADERS)
+            if book is None:
+                return None
+            reviews = await self.get_book_reviews(
+                book_uid, session, limit=Config.BOOK_DETAIL_REVIEW_COUNT
+            )
+            detail = BookDetailModel.model_validate(
+                {
+                    **BookModel.model_validate(book).model_dump(),
+                    "tags": book.tags,
+                    "reviews": reviews["items"],
+                    "reviews_next_cursor": reviews["next_cursor"],
+                }
+            )
+            return detail.model_dump(mode="json")
+
+        return await book_cache.get_or_load(book_uid, load_book_detail)
+
     async def create_book(
         self, book_data: BookCreateModel, user_uid: str, session: AsyncSession
     ):
-        book_data_dict = book_data.model_dump()
-        new_book = Book(**book_data_dict)
-        new_book.published_date = datetime.strptime(
-            book_data_dict["published_date"], "%Y-%m-%d"
-        )
-        new_book.user_id = user_uid
+        """
+        Insert a book with INSERT ... RETURNING, so the response is built from
+        the inserted row (defaults included) without reading it back.
+        """
+        values = book_data.model_dump()
+        values["published_date"] = datetime.strptime(
+            values["published_date"], "%Y-%m-%d"
+        ).date()
+        values["user_id"] = user_uid
 
-        session.add(new_book)
+        result = await session.execute(insert(Book).values(values).returning(Book))
+        new_book = result.scalar_one()
         await session.commit()
-        await session.refresh(new_book)
         return new_book
 
+    async def bulk_create_books(
+        self,
+        rows: AsyncIterator[Tuple[int, Any]],
+        user_uid: str,
+        session: AsyncSession,
+        batch_size: int = Config.BULK_IMPORT_BATCH_SIZE,
+        max_errors: int = Config.BULK_IMPORT_MAX_ERRORS,
+    ):
+        """
+        Validate and insert books from a stream of (line number, row) pairs.
+
+        Rows are written with one multi-row INSERT per batch and each batch is
+        committed on its own, so only `batch_size` rows are held in memory.
+        When a batch fails, its rows are retried one by one in savepoints, so
+        the rows the database rejects are reported and the rest are inserted.
+        """
+        report = {"inserted": 0, "failed": 0, "errors": [], "errors_truncated": False}
+
+        def record_error(line_no: int, errors: List[Any]):
+            report["failed"] += 1
+            if len(report["errors"]) < max_errors:
+                report["errors"].append({"line": line_no, "errors": errors})
+            else:
+                report["errors_truncated"] = True
+
+        async def flush(batch: List[Tuple[int, dict]]):
+            try:
+                await session.execute(
+                    insert(Book).returning(Book.uid), [values for _, values in batch]
+                )
+                await session.commit()
+                report["inserted"] += len(batch)
+            except SQLAlchemyError:
+                await session.rollback()
+                await flush_rows(batch)
+
+        async def flush_rows(batch: List[Tuple[int, dict]]):
+            statement = insert(Book).returning(Book.uid)
+            kept = []
+            for line_no, values in batch:
+                try:
+                    async with session.begin_nested():
+                        await session.execute(statement, values)
+                    kept.append(line_no)
+                except SQLAlchemyError as e:
+                    record_error(line_no, [f"Database error: {e.__class__.__name__}"])
+            try:
+                await session.commit()
+                report["inserted"] += len(kept)
+            except SQLAlchemyError as e:
+                await session.rollback()
+                for line_no in kept:
+                    record_error(line_no, [f"Database error: {e.__class__.__name__}"])
+
+        batch: List[Tuple[int, dict]] = []
+        async for line_no, row in rows:
+            if isinstance(row, RowParseError):
+                record_error(line_no, [str(row)])
+                continue
+
+            try:
+                book_data = BookCreateModel.model_validate(row)
+                values = book_data.model_dump()
+                values["published_date"] = datetime.strptime(
+                    values["published_date"], "%Y-%m-%d"
+                ).date()
+            except ValidationError as e:
+                record_error(
+                    line_no, e.errors(include_url=False, include_context=False)
+                )
+                continue
+            except ValueError as e:
+                record_error(line_no, [str(e)])
+                continue
+
+            values["user_id"] = user_uid
+            batch.append((line_no, values))
+            if len(batch) >= batch_size:
+                await flush(batch)
+                batch = []
+
+        if batch:
+            await flush(batch)
+
+        return report
+
+    async def stream_books(
+        self,
+        session: AsyncSession,
+        created_since: Optional[datetime] = None,
+        updated_since: Optional[datetime] = None,
+        batch_size: int = Config.EXPORT_BATCH_SIZE,
+    ):
+        """
+        Yield lists of book rows read through a server-side cursor.
+
+        Only the columns of `BookModel` are selected, so no relationships are
+        loaded. With a watermark the rows come back in ascending order of that
+        column, so an interrupted sync can resume from the last value it saw.
+        """
+        columns = [getattr(Book, name) for name in BookModel.model_fields]
+        statement = select(*columns)
+
+        if created_since is not None:
+            statement = statement.where(Book.created_at >= created_since)
+        if updated_since is not None:
+            statement = statement.where(Book.updated_at >= updated_since)
+
+        if updated_since is not None:
+            statement = statement.order_by(Book.updated_at, Book.uid)
+        elif created_since is not None:
+            statement = statement.order_by(Book.created_at, Book.uid)
+
+        result = await session.stream(statement.execution_options(yield_per=batch_size))
+        async for rows in result.partitions():
+            yield rows
+
     async def update_book(
         self, book_uid: str, update_data: BookUpdateModel, session: AsyncSession
     ):
-        book_to_update = await self.get_book(book_uid, session)
-        if book_to_update:
-            update_data_dict = update_data.model_dump()
+        """
+        Change only the fields present in `update_data`, in a single
+        UPDATE ... RETURNING that also tells whether the book exists.
+
+        Returns:
+            Optional[Book]: The updated book, or None if it does not exist
+        """
+        values = update_data.model_dump(exclude_unset=True, exclude_none=True)
+        if not values:
+            return await self.get_book(book_uid, session)
+
+        result = await session.execute(
+            update(Book).where(Book.uid == book_uid).values(values).returning(Book)
+        )
+        updated_book = result.scalar_one_or_none()
+        if updated_book is None:
+            return None
+
+        await session.commit()
+        await book_cache.invalidate(book_uid)
+        return updated_book
+
+    async def record_review_rating(
+        self, book_uid: str, rating: int, session: AsyncSession
+    ):
+        """
+        Fold a new review's rating into the book's aggregates.
 
-            for k, v in update_data_dict.items():
-                setattr(book_to_update, k, v)
+        Runs as a single atomic UPDATE in the caller's transaction, so the
+        aggregates commit or roll back together with the review itself.
 
+        Returns:
+            bool: Whether the book exists
+        """
+        bucket = Book.rating_histogram[rating + 1]  # Postgres arrays are 1-based
+        values = {
+            Book.review_count: Book.review_count + 1,
+            Book.rating_sum: Book.rating_sum + rating,
+        }
+        if 0 <= rating < RATING_BUCKETS:
+            values[bucket] = bucket + 1
+
+        statement = (
+            update(Book)
+            .where(Book.uid == book_uid)
+            .values(values)
+            .returning(Book.uid)
+            .execution_options(synchronize_session=False)
+        )
+        result = await session.execute(statement)
+        return result.first() is not None
+
+    async def reconcile_rating_aggregates(self, session: AsyncSession) -> int:
+        """
+        Recompute every book's rating aggregates from its reviews, only
+        rewriting rows that have drifted. Returns the number of fixed books.
+
+        Drifted books are locked and recomputed in batches, so a review
+        recorded meanwhile either lands before the recount or waits for it
+        and is added on top.
+        """
+        expected = rating_aggregates()
+        drifted = await session.execute(
+            select(Book.uid)
+            .join(expected, expected.c.uid == Book.uid)
+            .where(rating_drifted(expected))
+            .order_by(Book.uid)
+        )
+        book_uids = drifted.scalars().all()
+
+        fixed = 0
+        for start in range(0, len(book_uids), RECONCILE_BATCH_SIZE):
+            batch = book_uids[start : start + RECONCILE_BATCH_SIZE]
+            await session.execute(
+                select(Book.uid)
+                .where(Book.uid.in_(batch))
+                .order_by(Book.uid)
+                .with_for_update()
+            )
+            # A new statement, so the recount sees every review committed
+            # before the locks were granted
+            expected = rating_aggregates(batch)
+            statement = (
+                update(Book)
+                .where(Book.uid == expected.c.uid)
+                .where(rating_drifted(expected))
+                .values(
+                    review_count=expected.c.review_count,
+                    rating_sum=expected.c.rating_sum,
+                    rating_histogram=expected.c.rating_histogram,
+                )
+                .returning(Book.uid)
+                .execution_options(synchronize_session=False)
+            )
+            result = await session.execute(statement)
+            updated = result.scalars().all()
             await session.commit()
-            await session.refresh(book_to_update)
-            return book_to_update
-        return None
+            for book_uid in updated:
+                await book_cache.invalidate(book_uid)
+            fixed += len(updated)
+        return fixed
 
     async def delete_book(self, book_uid: str, session: AsyncSession):
 
@@ -59,18 +429,18 @@ class BookService:
         if book_to_delete:
             await session.delete(book_to_delete)
             await session.commit()
+            await book_cache.invalidate(book_uid)
             return True
         return None
 
-    async def get_user_books(self, user_uid: str, session: AsyncSession):
-        try:
-            statement = (
-                select(Book)
-                .where(Book.user_id == user_uid)
-                .order_by(desc(Book.created_at))
-            )
-            result = await session.exec(statement)
-            book = result.all()
-            return book
-        except NoResultFound:
-            return None
+    async def get_user_books(
+        self,
+        user_uid: str,
+        session: AsyncSession,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ):
+        statement = select(Book).where(Book.user_id == user_uid)
+        return await keyset_paginate(
+            session, statement, Book.created_at, Book.uid, limit, cursor
+        )
@@ -0,0 +1,77 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Iterable, Optional
+
+from fastapi import Request, Response, status
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    Build a strong ETag from the values that identify a representation,
+    e.g. a resource name, its uid and its `updated_at`.
+    """
+    digest = hashlib.sha256(":".join(str(part) for part in parts).encode())
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def make_page_etag(prefix: str, rows: Iterable[Any], *parts: Any) -> str:
+    """
+    Build a strong ETag for one page of a list from the `uid` and
+    `updated_at` of its rows and the values that selected the page, e.g. the
+    cursor and limit. Any change to a row on the page, or to which rows are
+    on it, changes the tag, so the page query itself is the only SQL needed.
+    """
+    return make_etag(
+        prefix, *parts, *(f"{row.uid}@{row.updated_at.isoformat()}" for row in rows)
+    )
+
+
+def _to_utc(value: datetime) -> datetime:
+    # Timestamps are stored naive in server local time (datetime.now)
+    return value.astimezone(timezone.utc)
+
+
+def is_conditional(request: Request) -> bool:
+    """Whether the request carries `If-None-Match` or `If-Modified-Since`."""
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def is_not_modified(
+    request: Request, etag: str, last_modified: Optional[datetime] = None
+) -> bool:
+    """
+    Evaluate the request's validators against the current representation.
+    `If-None-Match` takes precedence over `If-Modified-Since` (RFC 9110).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # HTTP dates have a resolution of one second
+    return _to_utc(last_modified).replace(microsecond=0) <= since
+
+
+def validator_headers(
+    etag: str, last_modified: Optional[datetime] = None
+) -> Dict[str, str]:
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(_to_utc(last_modified), usegmt=True)
+    return headers
+
+
+def not_modified_response(headers: Dict[str, str]) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
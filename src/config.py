@@ -1,12 +1,66 @@
+from typing import Dict, List
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Prepared statements kept per connection by the asyncpg driver; set 0
+    # behind a transaction-pooling PgBouncer
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100
+    # JSON list of read replica URLs, e.g. ["postgresql+asyncpg://..."]
+    DATABASE_REPLICA_URLS: List[str] = []
+    DB_REPLICA_HEALTH_INTERVAL: float = 5.0
+    DB_REPLICA_MAX_LAG: float = 5.0
+    DB_READ_YOUR_WRITES_WINDOW: float = 5.0
     JWT_SECRET: str
     JWT_ALGORITHM: str
+    JWT_CACHE_SIZE: int = 10000
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
+    SERVER_TIMING_HEADER: bool = True
+    # Bearer token scrapers send to /api/v1/metrics; the endpoints answer 404
+    # while it is empty
+    METRICS_TOKEN: str = ""
+    ACCESS_LOG_MAX_QUEUE: int = 10000
+    ACCESS_LOG_SAMPLE_RATE: float = 1.0
+    # JSON object of route template -> sample rate, e.g. {"/api/v1/books": 0.1}
+    ACCESS_LOG_ROUTE_SAMPLE_RATES: Dict[str, float] = {}
+    RATE_LIMIT_ENABLED: bool = True
+    # JSON object of "METHOD /route/{template}" (or "*" for every other route)
+    # -> role ("anonymous", "user", "admin" or "*") -> limit, e.g. "10/minute".
+    # Roles without a limit fall back to the "*" route's limit for the role.
+    RATE_LIMITS: Dict[str, Dict[str, str]] = {
+        "POST /api/v1/auth/login": {"anonymous": "10/minute"},
+        "POST /api/v1/auth/signup": {"anonymous": "5/minute"},
+        "*": {"anonymous": "120/minute", "user": "600/minute"},
+    }
+    # Routes in RATE_LIMITS limited by client address, whatever token is sent
+    RATE_LIMIT_CLIENT_ROUTES: List[str] = [
+        "POST /api/v1/auth/login",
+        "POST /api/v1/auth/signup",
+    ]
+    RATE_LIMIT_LEASE_FRACTION: float = 0.1
+    RATE_LIMIT_LEASE_TTL: float = 1.0
+    BOOK_CACHE_TTL: int = 300
+    BOOK_DETAIL_REVIEW_COUNT: int = 5
+    BULK_IMPORT_BATCH_SIZE: int = 1000
+    BULK_IMPORT_MAX_ERRORS: int = 1000
+    EXPORT_BATCH_SIZE: int = 1000
+    BLOCKLIST_NEGATIVE_TTL: float = 1.0
+    BLOCKLIST_BATCH_WINDOW: float = 0.002
+    BLOCKLIST_BLOOM_ENABLED: bool = False
+    BLOCKLIST_BLOOM_CAPACITY: int = 100000
+    BLOCKLIST_SYNC_INTERVAL: float = 30.0
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_EXECUTOR: str = "thread"  # "thread" or "process"
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
     MAIL_USERNAME: str
     MAIL_PASSWORD: str
     MAIL_FROM: str
@@ -16,6 +70,13 @@ class Settings(BaseSettings):
     MAIL_SSL_TLS: bool = True
     USE_CREDENTIALS: bool = True
     VALIDATE_CERTS: bool = True
+    MAIL_TIMEOUT: float = 60
+    MAIL_BATCH_SIZE: int = 50
+    MAIL_MAX_ATTEMPTS: int = 5
+    MAIL_RETRY_BACKOFF: float = 5.0
+    MAIL_RETRY_BACKOFF_MAX: float = 900.0
+    MAIL_CLAIM_IDLE: float = 300.0
+    MAIL_CONNECTION_IDLE_TIMEOUT: float = 30.0
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
@@ -0,0 +1,303 @@
+import asyncio
+import hashlib
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+import redis.asyncio as redis
+from loguru import logger
+
+# Sorted set of revoked jtis scored by expiry, used to rebuild Bloom filters
+REVOKED_JTIS_KEY = "blocklist:jtis"
+# Pub/sub channel on which revocations are broadcast to every worker
+REVOCATION_CHANNEL = "blocklist:revoked"
+
+
+class BloomFilter:
+    """
+    Minimal Bloom filter over strings using double hashing of a SHA-256 digest.
+
+    Args:
+        capacity (int): Expected number of items
+        error_rate (float): Target false positive rate at capacity
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001) -> None:
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hash_count = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterable[int]:
+        digest = hashlib.sha256(item.encode()).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+class TokenBlocklist:
+    """
+    Redis token blocklist that avoids a network round trip for most lookups.
+
+    Lookups are answered, in order, from:
+        - jtis this worker knows are revoked (own revocations and pub/sub)
+        - a short-lived local cache of jtis Redis reported as not revoked
+        - an optional Bloom filter of revoked jtis kept in sync over pub/sub
+        - Redis, with concurrent lookups coalesced into a single MGET
+
+    A revocation made on another worker is seen immediately over pub/sub, and
+    at the latest after `negative_ttl` seconds if that message is lost.
+    The Bloom filter is only trusted while subscribed and recently synced.
+
+    Args:
+        client (redis.Redis): Async Redis client
+        jti_expiry (int): Seconds a revoked jti stays in the blocklist
+        negative_ttl (float): Seconds a "not revoked" answer may be reused
+        negative_cache_size (int): Maximum number of cached "not revoked" answers
+        revoked_cache_size (int): Maximum number of revoked jtis kept locally
+        batch_window (float): Seconds to wait for concurrent lookups to batch
+        bloom_enabled (bool): Whether to maintain and consult a Bloom filter
+        bloom_capacity (int): Expected number of revoked jtis
+        sync_interval (float): Seconds between full Bloom filter rebuilds
+    """
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        jti_expiry: int,
+        negative_ttl: float = 1.0,
+        negative_cache_size: int = 100000,
+        revoked_cache_size: int = 100000,
+        batch_window: float = 0.002,
+        bloom_enabled: bool = False,
+        bloom_capacity: int = 100000,
+        sync_interval: float = 30.0,
+    ) -> None:
+        self.client = client
+        self.jti_expiry = jti_expiry
+        self.negative_ttl = negative_ttl
+        self.negative_cache_size = negative_cache_size
+        self.revoked_cache_size = revoked_cache_size
+        self.batch_window = batch_window
+        self.bloom_enabled = bloom_enabled
+        self.bloom_capacity = bloom_capacity
+        self.sync_interval = sync_interval
+
+        self._negative: "OrderedDict[str, float]" = OrderedDict()
+        self._revoked: "OrderedDict[str, float]" = OrderedDict()
+        self._bloom: Optional[BloomFilter] = None
+        self._last_sync = 0.0
+        self._subscribed = False
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._listener: Optional[asyncio.Task] = None
+
+        self.counters = {
+            "revoked_local": 0,
+            "negative_cache": 0,
+            "bloom_negative": 0,
+            "redis_lookups": 0,
+            "redis_batches": 0,
+        }
+
+    # Local state
+
+    def _mark_revoked(self, jti: str) -> None:
+        now = time.monotonic()
+        self._revoked[jti] = now + self.jti_expiry
+        self._revoked.move_to_end(jti)
+        self._negative.pop(jti, None)
+
+        # Entries share one expiry, so the oldest are always the first to
+        # expire. An entry evicted early is still found in Redis.
+        while self._revoked:
+            oldest_jti, expires_at = next(iter(self._revoked.items()))
+            if expires_at > now and len(self._revoked) <= self.revoked_cache_size:
+                break
+            del self._revoked[oldest_jti]
+
+        if self._bloom is not None:
+            self._bloom.add(jti)
+
+    def _is_revoked_locally(self, jti: str) -> bool:
+        expires_at = self._revoked.get(jti)
+        if expires_at is None:
+            return False
+        if time.monotonic() >= expires_at:
+            del self._revoked[jti]
+            return False
+        return True
+
+    def _cache_negative(self, jti: str) -> None:
+        now = time.monotonic()
+        self._negative[jti] = now + self.negative_ttl
+        self._negative.move_to_end(jti)
+
+        # Entries share one TTL, so the oldest are always the first to expire
+        while self._negative:
+            oldest_jti, expires_at = next(iter(self._negative.items()))
+            if expires_at > now and len(self._negative) <= self.negative_cache_size:
+                break
+            del self._negative[oldest_jti]
+
+    def _is_cached_negative(self, jti: str) -> bool:
+        expires_at = self._negative.get(jti)
+        if expires_at is None:
+            return False
+        if time.monotonic() >= expires_at:
+            del self._negative[jti]
+            return False
+        return True
+
+    def _bloom_is_fresh(self) -> bool:
+        return (
+            self._bloom is not None
+            and self._subscribed
+            and time.monotonic() - self._last_sync < 2 * self.sync_interval
+        )
+
+    # Public API
+
+    async def add(self, jti: str) -> None:
+        """Revoke a jti and broadcast the revocation to every worker."""
+        now = time.time()
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.set(name=jti, value="blocked", ex=self.jti_expiry)
+            pipe.zadd(REVOKED_JTIS_KEY, {jti: now + self.jti_expiry})
+            pipe.zremrangebyscore(REVOKED_JTIS_KEY, "-inf", now)
+            pipe.publish(REVOCATION_CHANNEL, jti)
+            await pipe.execute()
+
+        self._mark_revoked(jti)
+
+    async def contains(self, jti: str) -> bool:
+        """Check whether a jti has been revoked."""
+        if self._is_revoked_locally(jti):
+            self.counters["revoked_local"] += 1
+            return True
+
+        if self._is_cached_negative(jti):
+            self.counters["negative_cache"] += 1
+            return False
+
+        if self._bloom_is_fresh() and jti not in self._bloom:
+            self.counters["bloom_negative"] += 1
+            return False
+
+        return await self._lookup(jti)
+
+    # Batched Redis lookups
+
+    async def _lookup(self, jti: str) -> bool:
+        future = self._pending.get(jti)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[jti] = future
+            if self._flush_task is None:
+                self._flush_task = asyncio.create_task(self._flush())
+        return await asyncio.shield(future)
+
+    async def _flush(self) -> None:
+        await asyncio.sleep(self.batch_window)
+
+        pending, self._pending = self._pending, {}
+        self._flush_task = None
+        jtis: List[str] = list(pending)
+
+        self.counters["redis_batches"] += 1
+        self.counters["redis_lookups"] += len(jtis)
+        try:
+            results = await self.client.mget(jtis)
+        except Exception as e:
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(e)
+                    # Avoid "exception never retrieved" if the caller went away
+                    future.exception()
+            return
+
+        for jti, result in zip(jtis, results):
+            revoked = result is not None
+            if revoked:
+                self._mark_revoked(jti)
+            else:
+                self._cache_negative(jti)
+            if not pending[jti].done():
+                pending[jti].set_result(revoked)
+
+    # Pub/sub and Bloom filter sync
+
+    async def _sync(self) -> None:
+        now = time.time()
+        await self.client.zremrangebyscore(REVOKED_JTIS_KEY, "-inf", now)
+        jtis = await self.client.zrangebyscore(REVOKED_JTIS_KEY, now, "+inf")
+
+        bloom = BloomFilter(max(self.bloom_capacity, len(jtis)))
+        for jti in jtis:
+            bloom.add(jti)
+        self._bloom = bloom
+        self._last_sync = time.monotonic()
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self.client.pubsub() as pubsub:
+                    await pubsub.subscribe(REVOCATION_CHANNEL)
+                    self._subscribed = True
+                    if self.bloom_enabled:
+                        await self._sync()
+
+                    while True:
+                        message = await pubsub.get_message(
+                            ignore_subscribe_messages=True, timeout=1.0
+                        )
+                        if message is not None:
+                            self._mark_revoked(message["data"])
+
+                        if (
+                            self.bloom_enabled
+                            and time.monotonic() - self._last_sync >= self.sync_interval
+                        ):
+                            await self._sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Token blocklist subscription lost: {e}")
+            finally:
+                self._subscribed = False
+            await asyncio.sleep(1)
+
+    async def start(self) -> None:
+        """Start listening for revocations broadcast by other workers."""
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        """Stop the revocation listener."""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "negative_cache_size": len(self._negative),
+            "revoked_local_size": len(self._revoked),
+            "subscribed": self._subscribed,
+            "bloom_fresh": self._bloom_is_fresh(),
+        }
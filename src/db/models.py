@@ -1,14 +1,30 @@
 import uuid
 from datetime import date, datetime
 
-from sqlmodel import Field, SQLModel, Column, Relationship, desc
+from sqlmodel import Field, SQLModel, Column, Index, Relationship, desc
+from sqlalchemy import DDL, Computed, event
 from typing import Optional, List
 import sqlalchemy.dialects.postgresql as pg
 
+# Text search configuration used for the books search vector and queries
+BOOK_SEARCH_CONFIG = "english"
+
+# Review ratings are 0-4; bucket i of Book.rating_histogram counts rating i
+RATING_BUCKETS = 5
+
+
+# Relationships are never loaded implicitly. Service methods declare the
+# loader options their response models need, so a missing one raises instead
+# of silently issuing extra queries.
+
 
 # User Model
 class User(SQLModel, table=True):
     __tablename__ = "users"
+    __table_args__ = (
+        # Login and every authenticated request look users up by email
+        Index("ix_users_email", "email", unique=True),
+    )
 
     uid: uuid.UUID = Field(
         sa_column=Column(pg.UUID, nullable=False, primary_key=True, default=uuid.uuid4)
@@ -26,11 +42,11 @@ class User(SQLModel, table=True):
     updated_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
     books: List["Book"] = Relationship(
         back_populates="user",
-        sa_relationship_kwargs={"lazy": "selectin", "order_by": desc("created_at")},
+        sa_relationship_kwargs={"lazy": "raise", "order_by": desc("created_at")},
     )
     reviews: List["Review"] = Relationship(
         back_populates="user",
-        sa_relationship_kwargs={"lazy": "selectin", "order_by": desc("created_at")},
+        sa_relationship_kwargs={"lazy": "raise", "order_by": desc("created_at")},
     )
 
     def __repr__(self):
@@ -46,15 +62,23 @@ class BookTag(SQLModel, table=True):
 # Tags Model
 class Tag(SQLModel, table=True):
     __tablename__ = "tags"
+    __table_args__ = (
+        # Tag upserts rely on ON CONFLICT (name)
+        Index("ix_tags_name", "name", unique=True),
+    )
 
     uid: uuid.UUID = Field(
         sa_column=Column(pg.UUID, nullable=False, primary_key=True, default=uuid.uuid4)
     )
     name: str = Field(sa_column=Column(pg.VARCHAR, nullable=False))
     created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
+    updated_at: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(pg.TIMESTAMP, default=datetime.now, onupdate=datetime.now),
+    )
     books: List["Book"] = Relationship(
         back_populates="tags",
-        sa_relationship_kwargs={"lazy": "selectin"},
+        sa_relationship_kwargs={"lazy": "raise"},
         link_model=BookTag,
     )
 
@@ -65,6 +89,41 @@ class Tag(SQLModel, table=True):
 # Book Model
 class Book(SQLModel, table=True):
     __tablename__ = "books"
+    __table_args__ = (
+        # Keyset pagination indexes for the book list endpoints
+        Index("ix_books_created_at_uid", "created_at", "uid"),
+        Index("ix_books_user_id_created_at_uid", "user_id", "created_at", "uid"),
+        # Watermark index for incremental catalog exports
+        Index("ix_books_updated_at_uid", "updated_at", "uid"),
+        # Weighted full-text search vector over title, author and publisher.
+        # It lives on the table only and is excluded from the mapper below,
+        # so loading a Book never pulls it.
+        Column(
+            "search_vector",
+            pg.TSVECTOR,
+            Computed(
+                f"setweight(to_tsvector('{BOOK_SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+                f"setweight(to_tsvector('{BOOK_SEARCH_CONFIG}', coalesce(author, '')), 'B') || "
+                f"setweight(to_tsvector('{BOOK_SEARCH_CONFIG}', coalesce(publisher, '')), 'C')",
+                persisted=True,
+            ),
+        ),
+        Index("ix_books_search_vector", "search_vector", postgresql_using="gin"),
+        # Trigram indexes for prefix and fuzzy matching
+        Index(
+            "ix_books_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_books_author_trgm",
+            "author",
+            postgresql_using="gin",
+            postgresql_ops={"author": "gin_trgm_ops"},
+        ),
+    )
+    __mapper_args__ = {"exclude_properties": ["search_vector"]}
 
     uid: uuid.UUID = Field(
         sa_column=Column(pg.UUID, nullable=False, primary_key=True, default=uuid.uuid4)
@@ -77,15 +136,36 @@ class Book(SQLModel, table=True):
     language: str
     user_id: Optional[uuid.UUID] = Field(default=None, foreign_key="users.uid")
     created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
-    updated_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
-    user: Optional["User"] = Relationship(back_populates="books")
+    # Bumped on every change to the book, its aggregates or its tags; the
+    # ETags of book responses are derived from it
+    updated_at: datetime = Field(
+        sa_column=Column(pg.TIMESTAMP, default=datetime.now, onupdate=datetime.now)
+    )
+    # Rating aggregates, maintained with each new review
+    review_count: int = Field(
+        default=0, sa_column=Column(pg.INTEGER, nullable=False, server_default="0")
+    )
+    rating_sum: int = Field(
+        default=0, sa_column=Column(pg.INTEGER, nullable=False, server_default="0")
+    )
+    rating_histogram: List[int] = Field(
+        default_factory=lambda: [0] * RATING_BUCKETS,
+        sa_column=Column(
+            pg.ARRAY(pg.INTEGER),
+            nullable=False,
+            server_default="{" + ",".join(["0"] * RATING_BUCKETS) + "}",
+        ),
+    )
+    user: Optional["User"] = Relationship(
+        back_populates="books", sa_relationship_kwargs={"lazy": "raise"}
+    )
     reviews: List["Review"] = Relationship(
         back_populates="book",
-        sa_relationship_kwargs={"lazy": "selectin", "order_by": desc("created_at")},
+        sa_relationship_kwargs={"lazy": "raise", "order_by": desc("created_at")},
     )
     tags: List["Tag"] = Relationship(
         back_populates="books",
-        sa_relationship_kwargs={"lazy": "selectin", "order_by": desc("created_at")},
+        sa_relationship_kwargs={"lazy": "raise", "order_by": desc("created_at")},
         link_model=BookTag,
     )
 
@@ -93,9 +173,23 @@ class Book(SQLModel, table=True):
         return f"<Book {self.title}>"
 
 
+# The trigram indexes need pg_trgm when the tables are created by init_db
+event.listen(
+    Book.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"),
+)
+
+
 # Review Model
 class Review(SQLModel, table=True):
     __tablename__ = "reviews"
+    __table_args__ = (
+        # Keyset pagination of a book's reviews, newest first
+        Index("ix_reviews_book_uid_created_at_uid", "book_uid", "created_at", "uid"),
+        # User.reviews is loaded by user_uid, newest first
+        Index("ix_reviews_user_uid_created_at", "user_uid", "created_at"),
+    )
 
     uid: uuid.UUID = Field(
         sa_column=Column(pg.UUID, nullable=False, primary_key=True, default=uuid.uuid4)
@@ -106,8 +200,12 @@ class Review(SQLModel, table=True):
     book_uid: Optional[uuid.UUID] = Field(default=None, foreign_key="books.uid")
     created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
     updated_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
-    user: Optional["User"] = Relationship(back_populates="reviews")
-    book: Optional["Book"] = Relationship(back_populates="reviews")
+    user: Optional["User"] = Relationship(
+        back_populates="reviews", sa_relationship_kwargs={"lazy": "raise"}
+    )
+    book: Optional["Book"] = Relationship(
+        back_populates="reviews", sa_relationship_kwargs={"lazy": "raise"}
+    )
 
     def __repr__(self):
         return f"<Review for book {self.book_uid} by user {self.user_uid}>"
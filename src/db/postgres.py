@@ -1,23 +1,130 @@
+import asyncio
+import time
+
 from sqlmodel import SQLModel, create_engine
+from sqlalchemy import event, exc
 from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from fastapi import Request
 from loguru import logger
 
+from src.auth.utils import request_identity
 from src.config import Config
+from src.instrumentation import record_timing
+from src.metrics import LatencyStats, register_metrics
+from .redis import redis_client
+from .replicas import ReadYourWrites, ReplicaSet
 
-# Create the async engine
-async_engine = AsyncEngine(
-    create_engine(
-        url=Config.DATABASE_URL,
-        # echo=True,  # Uncomment for SQLAlchemy engine logs
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Async queue pool that records how long callers wait to acquire a
+    connection and how often they time out doing so.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.acquire_latency = LatencyStats()
+        self.acquire_timeouts = 0
+        self.overflow_connections = 0
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.acquire_timeouts += 1
+            raise
+        finally:
+            self.acquire_latency.observe(time.perf_counter() - start)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "overflow_connections": self.overflow_connections,
+            "acquire_timeouts": self.acquire_timeouts,
+            "acquire_latency": self.acquire_latency.snapshot(),
+        }
+
+
+def create_instrumented_engine(url: str) -> AsyncEngine:
+    """
+    Create an async engine with the configured pool whose statements are
+    added to the current request's SQL timings.
+    """
+    engine = AsyncEngine(
+        create_engine(
+            url=url,
+            poolclass=InstrumentedQueuePool,
+            pool_size=Config.DB_POOL_SIZE,
+            max_overflow=Config.DB_MAX_OVERFLOW,
+            pool_timeout=Config.DB_POOL_TIMEOUT,
+            pool_recycle=Config.DB_POOL_RECYCLE,
+            pool_pre_ping=Config.DB_POOL_PRE_PING,
+            connect_args={
+                "prepared_statement_cache_size": Config.DB_PREPARED_STATEMENT_CACHE_SIZE
+            },
+            # echo=True,  # Uncomment for SQLAlchemy engine logs
+        )
     )
-)
+    pool = engine.sync_engine.pool
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def count_overflow_connection(dbapi_connection, connection_record):
+        """Count new connections opened beyond the configured pool size."""
+        if pool.overflow() > 0:
+            pool.overflow_connections += 1
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def start_statement_timer(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        context.statement_start = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def record_statement_time(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        """Add the statement to the current request's SQL timings."""
+        record_timing("sql", time.perf_counter() - context.statement_start)
+
+    return engine
+
+
+# Create the async engine
+async_engine = create_instrumented_engine(Config.DATABASE_URL)
+
+register_metrics("db_pool", lambda: async_engine.sync_engine.pool.stats())
 
 SessionFactory = sessionmaker(
     bind=async_engine, class_=AsyncSession, expire_on_commit=False
 )
 
+replica_set = ReplicaSet(
+    [create_instrumented_engine(url) for url in Config.DATABASE_REPLICA_URLS],
+    health_interval=Config.DB_REPLICA_HEALTH_INTERVAL,
+    max_lag=Config.DB_REPLICA_MAX_LAG,
+)
+read_your_writes = ReadYourWrites(
+    redis_client, window=Config.DB_READ_YOUR_WRITES_WINDOW
+)
+
+if replica_set.replicas:
+    register_metrics("db_replicas", replica_set.stats)
+    register_metrics("read_your_writes", read_your_writes.stats)
+
+
+@event.listens_for(Session, "after_commit")
+def mark_committed(session):
+    """Flag sessions that committed, so their requests can pin reads to the primary."""
+    session.info["committed"] = True
+
 
 async def init_db():
     """
@@ -33,11 +140,67 @@ async def init_db():
         raise
 
 
-async def get_session() -> AsyncSession:  # type: ignore
+async def get_session(request: Request) -> AsyncSession:  # type: ignore
     """
     Get a new database session.
     This function yields a session and ensures proper cleanup.
+
+    When read replicas are configured, a commit pins the caller's reads to
+    the primary for DB_READ_YOUR_WRITES_WINDOW seconds.
+    """
+    async with SessionFactory() as session:
+        yield session
+        if replica_set.replicas and session.info.get("committed"):
+            identity = (await request_identity(request))[1]
+            await read_your_writes.pin(identity)
+
+
+def is_connection_error(error: BaseException) -> bool:
+    """Whether `error` means the database could not be reached or the connection broke."""
+    if isinstance(error, exc.DBAPIError) and error.connection_invalidated:
+        return True
+    # asyncpg raises OSError (e.g. ConnectionRefusedError) and timeouts while
+    # connecting, before SQLAlchemy gets to wrap them
+    return isinstance(
+        error, (exc.OperationalError, exc.InterfaceError, OSError, asyncio.TimeoutError)
+    )
+
+
+async def get_read_session(request: Request) -> AsyncSession:  # type: ignore
+    """
+    Get a database session for read-only work.
+
+    Sessions come from a healthy read replica, or from the primary when no
+    replica is configured or healthy, or when the caller has written recently.
+    A replica that cannot be connected to is marked failed and the next one,
+    or the primary, is used instead.
     """
+    if replica_set.replicas and not await read_your_writes.is_pinned(
+        (await request_identity(request))[1]
+    ):
+        # Each failed replica is marked unhealthy, so this ends at the primary
+        while (replica := replica_set.choose()) is not None:
+            session = replica.session_factory()
+            try:
+                # Check out a connection up front, so an unreachable replica
+                # falls back here instead of failing the request
+                await session.connection()
+            except Exception as e:
+                await session.close()
+                if not is_connection_error(e):
+                    raise
+                replica_set.mark_failed(replica, e)
+                continue
+
+            async with session:
+                try:
+                    yield session
+                except Exception as e:
+                    if is_connection_error(e):
+                        replica_set.mark_failed(replica, e)
+                    raise
+            return
+
     async with SessionFactory() as session:
         yield session
 
@@ -48,3 +211,4 @@ async def close_db() -> None:
     """
     logger.info("Closing PostgreSQL connection pool...")
     await async_engine.dispose()
+    await replica_set.dispose()
@@ -1,23 +1,68 @@
+import time
+
 import redis.asyncio as redis
+from redis.asyncio.client import Pipeline
 from src.config import Config
+from src.instrumentation import record_timing
+from src.metrics import register_metrics
+from .blocklist import TokenBlocklist
 
 JTI_EXPIRY = 3600
 
+
+class InstrumentedPipeline(Pipeline):
+    """Pipeline that adds each round trip to the current request's Redis timings."""
+
+    async def execute(self, raise_on_error: bool = True):
+        start = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            record_timing("redis", time.perf_counter() - start)
+
+
+class InstrumentedRedis(redis.Redis):
+    """Redis client that adds each command to the current request's Redis timings."""
+
+    async def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            record_timing("redis", time.perf_counter() - start)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> Pipeline:
+        return InstrumentedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+
+
 # Create async Redis connection
-token_blocklist = redis.Redis(
+redis_client = InstrumentedRedis(
     host=Config.REDIS_HOST,
     port=Config.REDIS_PORT,
     db=0,
     decode_responses=True,  # Add this to handle string responses
 )
 
+token_blocklist = TokenBlocklist(
+    redis_client,
+    jti_expiry=JTI_EXPIRY,
+    negative_ttl=Config.BLOCKLIST_NEGATIVE_TTL,
+    batch_window=Config.BLOCKLIST_BATCH_WINDOW,
+    bloom_enabled=Config.BLOCKLIST_BLOOM_ENABLED,
+    bloom_capacity=Config.BLOCKLIST_BLOOM_CAPACITY,
+    sync_interval=Config.BLOCKLIST_SYNC_INTERVAL,
+)
+
+register_metrics("token_blocklist", token_blocklist.stats)
+
 
 async def add_jti_to_blocklist(jti: str) -> None:
     """Add a JWT token ID to the blocklist."""
-    await token_blocklist.set(name=jti, value="blocked", ex=JTI_EXPIRY)
+    await token_blocklist.add(jti)
 
 
 async def token_in_blocklist(jti: str) -> bool:
     """Check if a JWT token ID is in the blocklist."""
-    result = await token_blocklist.get(jti)
-    return result is not None
+    return await token_blocklist.contains(jti)
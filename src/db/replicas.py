@@ -0,0 +1,222 @@
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+import redis.asyncio as redis
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+# Seconds the replica is behind its primary; 0 when it has replayed all WAL
+# it received, so an idle primary does not make the replica look stale
+REPLICATION_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+    "END"
+)
+
+
+class Replica:
+    """A read replica's engine, session factory and last known health."""
+
+    def __init__(self, engine: AsyncEngine) -> None:
+        self.engine = engine
+        self.name = engine.url.render_as_string(hide_password=True)
+        self.session_factory = sessionmaker(
+            bind=engine, class_=AsyncSession, expire_on_commit=False
+        )
+        self.healthy = True
+        self.lag: Optional[float] = None
+        self.sessions = 0
+        self.failures = 0
+
+    def stats(self) -> dict:
+        return {
+            "healthy": self.healthy,
+            "lag": self.lag,
+            "sessions": self.sessions,
+            "failures": self.failures,
+            "pool": self.engine.sync_engine.pool.stats(),
+        }
+
+
+class ReplicaSet:
+    """
+    Read replicas that sessions are handed out from in round-robin order.
+
+    Replicas are checked every `health_interval` seconds and left out of the
+    rotation while they are unreachable or more than `max_lag` seconds behind
+    the primary. A replica whose connection fails while serving a request is
+    left out until its next successful check. When no replica is healthy,
+    `choose` returns None and callers read from the primary.
+
+    Args:
+        engines (List[AsyncEngine]): One engine per replica
+        health_interval (float): Seconds between health checks
+        max_lag (float): Replication lag beyond which a replica is unhealthy
+        check_timeout (float): Seconds a health check may take
+    """
+
+    def __init__(
+        self,
+        engines: List[AsyncEngine],
+        health_interval: float = 5.0,
+        max_lag: float = 5.0,
+        check_timeout: float = 2.0,
+    ) -> None:
+        self.replicas = [Replica(engine) for engine in engines]
+        self.health_interval = health_interval
+        self.max_lag = max_lag
+        self.check_timeout = check_timeout
+        self.primary_fallbacks = 0
+        self._next = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def choose(self) -> Optional[Replica]:
+        """Return the next healthy replica, or None to use the primary."""
+        count = len(self.replicas)
+        for offset in range(count):
+            replica = self.replicas[(self._next + offset) % count]
+            if replica.healthy:
+                self._next = (self._next + offset + 1) % count
+                replica.sessions += 1
+                return replica
+        if count:
+            self.primary_fallbacks += 1
+        return None
+
+    def mark_failed(self, replica: Replica, error: Exception) -> None:
+        replica.failures += 1
+        if replica.healthy:
+            logger.warning(f"Read replica {replica.name} failed, using others: {error}")
+        replica.healthy = False
+
+    async def _lag(self, replica: Replica) -> float:
+        async with replica.engine.connect() as conn:
+            return float(await conn.scalar(REPLICATION_LAG_SQL))
+
+    async def _check(self, replica: Replica) -> None:
+        try:
+            lag = await asyncio.wait_for(self._lag(replica), self.check_timeout)
+        except Exception as e:
+            replica.lag = None
+            if replica.healthy:
+                logger.warning(f"Read replica {replica.name} is unreachable: {e}")
+            replica.healthy = False
+            return
+
+        replica.lag = lag
+        healthy = lag <= self.max_lag
+        if healthy != replica.healthy:
+            state = "healthy again" if healthy else f"{lag:.1f}s behind"
+            logger.info(f"Read replica {replica.name} is {state}")
+        replica.healthy = healthy
+
+    async def check(self) -> None:
+        """Check every replica once."""
+        await asyncio.gather(*(self._check(replica) for replica in self.replicas))
+
+    async def _check_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval)
+            await self.check()
+
+    async def start(self) -> None:
+        """Check the replicas, then keep checking them in the background."""
+        if not self.replicas or self._task is not None:
+            return
+        await self.check()
+        self._task = asyncio.create_task(self._check_loop())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def stats(self) -> dict:
+        return {
+            "primary_fallbacks": self.primary_fallbacks,
+            "replicas": {replica.name: replica.stats() for replica in self.replicas},
+        }
+
+
+class ReadYourWrites:
+    """
+    Remembers who wrote recently, so their reads can go to the primary until
+    replicas have caught up with the write.
+
+    Writes are recorded in Redis so every worker sees them, and in this
+    worker so its own follow-up reads need no Redis round trip. When Redis is
+    unavailable, reads are sent to the primary.
+
+    Args:
+        client (redis.Redis): Async Redis client
+        window (float): Seconds after a write that reads use the primary
+    """
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        window: float,
+        max_local: int = 10000,
+        key_prefix: str = "rw:",
+    ) -> None:
+        self.client = client
+        self.window = window
+        self.max_local = max_local
+        self.key_prefix = key_prefix
+        self._local: Dict[str, float] = {}
+        self.pinned_reads = 0
+        self.errors = 0
+
+    async def pin(self, identity: str) -> None:
+        """Record a write by `identity`."""
+        now = time.monotonic()
+        self._local.pop(identity, None)
+        self._local[identity] = now + self.window
+
+        # Entries share one window, so the oldest are always the first to expire
+        while self._local:
+            oldest, until = next(iter(self._local.items()))
+            if until > now and len(self._local) <= self.max_local:
+                break
+            del self._local[oldest]
+
+        try:
+            await self.client.set(
+                f"{self.key_prefix}{identity}", 1, px=int(self.window * 1000)
+            )
+        except redis.RedisError as e:
+            self.errors += 1
+            logger.warning(f"Could not record write by {identity}: {e}")
+
+    async def is_pinned(self, identity: str) -> bool:
+        """Whether `identity` wrote within the window and should read from the primary."""
+        pinned = self._local.get(identity, 0.0) > time.monotonic()
+        if not pinned:
+            try:
+                pinned = bool(await self.client.exists(f"{self.key_prefix}{identity}"))
+            except redis.RedisError as e:
+                self.errors += 1
+                logger.warning(f"Could not check writes by {identity}: {e}")
+                pinned = True
+        if pinned:
+            self.pinned_reads += 1
+        return pinned
+
+    def stats(self) -> dict:
+        return {
+            "window": self.window,
+            "pinned_reads": self.pinned_reads,
+            "errors": self.errors,
+        }
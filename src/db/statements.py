@@ -0,0 +1,33 @@
+from typing import Dict, Generic, Tuple, TypeVar
+
+from sqlalchemy.sql import Executable
+
+StatementT = TypeVar("StatementT", bound=Executable)
+
+
+class CachedStatement(Generic[StatementT]):
+    """
+    A parameterized statement built once at import time.
+
+    SQLAlchemy memoizes a statement's cache key on the statement object, so
+    reusing one object with `bindparam` placeholders skips both building the
+    statement and generating its key on every call; the compiled SQL then
+    comes straight from the engine's compiled cache. Executing a freshly built
+    `select(...)` repeats that work each time.
+
+    Variants with loader options are built on first use and kept, so options
+    must be module-level constants rather than tuples built per call.
+
+    Args:
+        statement: Statement with `bindparam` placeholders for its values
+    """
+
+    def __init__(self, statement: StatementT) -> None:
+        self.statement = statement
+        self._variants: Dict[Tuple, StatementT] = {(): statement}
+
+    def with_options(self, options: Tuple = ()) -> StatementT:
+        variant = self._variants.get(options)
+        if variant is None:
+            variant = self._variants[options] = self.statement.options(*options)
+        return variant
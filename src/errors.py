@@ -83,6 +83,18 @@ class UserNotFound(BooklyException):
     pass
 
 
+class PasswordHashingBusy(BooklyException):
+    """Password hashing pool is saturated and cannot accept more work"""
+
+    pass
+
+
+class InvalidCursor(BooklyException):
+    """User has provided a malformed pagination cursor"""
+
+    pass
+
+
 def create_exception_handler(
     status_code: int, initial_detail: Any
 ) -> Callable[[Request, Exception], JSONResponse]:
@@ -232,6 +244,29 @@ def register_all_errors(app: FastAPI):
         ),
     )
 
+    app.add_exception_handler(
+        InvalidCursor,
+        create_exception_handler(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            initial_detail={
+                "message": "Pagination cursor is invalid",
+                "resolution": "Use the next_cursor returned by the previous page",
+                "error_code": "invalid_cursor",
+            },
+        ),
+    )
+
+    app.add_exception_handler(
+        PasswordHashingBusy,
+        create_exception_handler(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            initial_detail={
+                "message": "Server is busy, please try again shortly",
+                "error_code": "server_busy",
+            },
+        ),
+    )
+
     @app.exception_handler(500)
     async def internal_server_error(request, exc):
 
@@ -0,0 +1,103 @@
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from src.metrics import Histogram, register_histogram
+
+# Phases timed per request; "app" is whatever time is left (Python, serialization)
+REQUEST_PHASES = ("sql", "redis", "hash")
+
+request_duration = register_histogram(
+    Histogram(
+        "bookly_request_duration_seconds",
+        "Time to produce a response, by route",
+        ("method", "route", "status"),
+    )
+)
+request_phase_duration = register_histogram(
+    Histogram(
+        "bookly_request_phase_duration_seconds",
+        "Time each request spent in SQL, Redis, password hashing and the app itself",
+        ("method", "route", "phase"),
+    )
+)
+request_sql_statements = register_histogram(
+    Histogram(
+        "bookly_request_sql_statements",
+        "SQL statements executed per request",
+        ("method", "route"),
+        buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+    )
+)
+
+
+class RequestTimings:
+    """Number of operations and time spent per phase while serving one request."""
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.counts: Dict[str, int] = dict.fromkeys(REQUEST_PHASES, 0)
+        self.seconds: Dict[str, float] = dict.fromkeys(REQUEST_PHASES, 0.0)
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.counts[phase] += 1
+        self.seconds[phase] += seconds
+
+    def app_seconds(self, total: float) -> float:
+        return max(total - sum(self.seconds.values()), 0.0)
+
+    def server_timing(self, total: float) -> str:
+        """Format the timings as a `Server-Timing` header value."""
+        metrics = [
+            f'{phase};dur={self.seconds[phase] * 1000:.2f};desc="{self.counts[phase]}"'
+            for phase in REQUEST_PHASES
+            if self.counts[phase]
+        ]
+        metrics.append(f"app;dur={self.app_seconds(total) * 1000:.2f}")
+        metrics.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(metrics)
+
+    def as_log_fields(self, total: float) -> dict:
+        fields = {"duration_ms": round(total * 1000, 2)}
+        for phase in REQUEST_PHASES:
+            fields[f"{phase}_count"] = self.counts[phase]
+            fields[f"{phase}_ms"] = round(self.seconds[phase] * 1000, 2)
+        fields["app_ms"] = round(self.app_seconds(total) * 1000, 2)
+        return fields
+
+    def observe(self, method: str, route: str, status: int, total: float) -> None:
+        """Record this request in the Prometheus histograms."""
+        request_duration.observe(total, method, route, str(status))
+        for phase in REQUEST_PHASES:
+            request_phase_duration.observe(self.seconds[phase], method, route, phase)
+        request_phase_duration.observe(self.app_seconds(total), method, route, "app")
+        request_sql_statements.observe(self.counts["sql"], method, route)
+
+
+# Timings of the request being served by the current task, if any
+_request_timings: ContextVar[Optional[RequestTimings]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def start_request_timings():
+    """
+    Start timing a request in the current context.
+
+    Returns:
+        Tuple[RequestTimings, Token]: The timings and the token to pass to
+        `end_request_timings`
+    """
+    timings = RequestTimings()
+    return timings, _request_timings.set(timings)
+
+
+def end_request_timings(token) -> None:
+    _request_timings.reset(token)
+
+
+def record_timing(phase: str, seconds: float) -> None:
+    """Add an operation to the current request's timings; a no-op outside requests."""
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.add(phase, seconds)
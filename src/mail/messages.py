@@ -0,0 +1,16 @@
+from src.db.models import User
+from .schemas import EmailModel
+
+
+def welcome_email(user: User) -> EmailModel:
+    """Email sent to a user once their account is created."""
+    return EmailModel(
+        recipients=[user.email],
+        subject="Welcome to Bookly",
+        body=(
+            f"Hi {user.first_name},\n\n"
+            f"Your Bookly account {user.username} is ready. "
+            "Start adding the books you love and reviewing the ones you read.\n\n"
+            "The Bookly team"
+        ),
+    )
@@ -0,0 +1,158 @@
+import time
+from typing import List, Optional, Tuple
+
+import redis.asyncio as redis
+from loguru import logger
+
+from src.config import Config
+from src.db.redis import redis_client
+from src.metrics import register_metrics
+from .schemas import EmailModel
+
+# Stream of messages ready to send, read by workers through a consumer group
+STREAM_KEY = "mail:stream"
+CONSUMER_GROUP = "mailers"
+# Sorted set of messages waiting to be retried, scored by when they are due
+RETRY_KEY = "mail:retry"
+# List of messages that could not be delivered
+DEAD_LETTER_KEY = "mail:dead"
+
+# Move retries that are due back onto the stream, atomically so two workers
+# never promote the same message.
+PROMOTE_DUE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, message in ipairs(due) do
+    redis.call('XADD', KEYS[2], '*', 'message', message)
+end
+if #due > 0 then
+    redis.call('ZREM', KEYS[1], unpack(due))
+end
+return #due
+"""
+
+
+class EmailQueue:
+    """
+    Durable outgoing mail queue on a Redis stream.
+
+    Request handlers only `enqueue`; delivery happens in `src.mail.worker`.
+    Workers read through a consumer group, so a message stays pending until
+    a worker acknowledges it, and messages held by a worker that died are
+    claimed by another after `claim_idle` seconds. Failed deliveries are
+    acknowledged and parked in a sorted set until their retry is due.
+
+    Args:
+        client (redis.Redis): Async Redis client
+        claim_idle (float): Seconds before a pending message may be reclaimed
+    """
+
+    def __init__(self, client: redis.Redis, claim_idle: float = 300.0) -> None:
+        self.client = client
+        self.claim_idle = claim_idle
+        self._promote = client.register_script(PROMOTE_DUE_SCRIPT)
+        self.enqueued = 0
+        self.enqueue_errors = 0
+
+    async def enqueue(self, email: EmailModel) -> Optional[str]:
+        """
+        Queue an email for delivery.
+
+        A failure to queue is logged rather than raised, so it never fails
+        the request that triggered the email.
+
+        Returns:
+            Optional[str]: The stream entry id, or None if Redis is unavailable
+        """
+        try:
+            entry_id = await self.client.xadd(
+                STREAM_KEY, {"message": email.model_dump_json()}
+            )
+        except redis.RedisError as e:
+            self.enqueue_errors += 1
+            logger.error(f"Could not queue email {email.id}: {e}")
+            return None
+        self.enqueued += 1
+        return entry_id
+
+    # Worker side
+
+    async def ensure_group(self) -> None:
+        """Create the stream and consumer group if they do not exist."""
+        try:
+            await self.client.xgroup_create(
+                STREAM_KEY, CONSUMER_GROUP, id="0", mkstream=True
+            )
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def promote_due(self, limit: int) -> int:
+        """Move up to `limit` retries that are due back onto the stream."""
+        return await self._promote(
+            keys=[RETRY_KEY, STREAM_KEY], args=[time.time(), limit]
+        )
+
+    async def read(
+        self, consumer: str, count: int, block: float
+    ) -> List[Tuple[str, Optional[str]]]:
+        """
+        Take up to `count` messages for `consumer`, first reclaiming messages
+        another consumer left pending, then waiting up to `block` seconds for
+        new ones.
+
+        Returns:
+            List[Tuple[str, Optional[str]]]: Entry ids and serialized
+            `EmailModel`s; the message is None for malformed entries
+        """
+        _, entries, *_ = await self.client.xautoclaim(
+            STREAM_KEY,
+            CONSUMER_GROUP,
+            consumer,
+            min_idle_time=int(self.claim_idle * 1000),
+            count=count,
+        )
+        if not entries:
+            streams = await self.client.xreadgroup(
+                CONSUMER_GROUP,
+                consumer,
+                {STREAM_KEY: ">"},
+                count=count,
+                block=int(block * 1000),
+            )
+            entries = streams[0][1] if streams else []
+        return [
+            (entry_id, (fields or {}).get("message")) for entry_id, fields in entries
+        ]
+
+    async def ack(self, entry_ids: List[str]) -> None:
+        """Acknowledge delivered messages and remove them from the stream."""
+        if not entry_ids:
+            return
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.xack(STREAM_KEY, CONSUMER_GROUP, *entry_ids)
+            pipe.xdel(STREAM_KEY, *entry_ids)
+            await pipe.execute()
+
+    async def retry(self, entry_id: str, email: EmailModel, delay: float) -> None:
+        """Acknowledge a failed delivery and schedule it again in `delay` seconds."""
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.zadd(RETRY_KEY, {email.model_dump_json(): time.time() + delay})
+            pipe.xack(STREAM_KEY, CONSUMER_GROUP, entry_id)
+            pipe.xdel(STREAM_KEY, entry_id)
+            await pipe.execute()
+
+    async def dead_letter(self, entry_id: str, payload: str) -> None:
+        """Acknowledge a message that will not be delivered and keep it for inspection."""
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.lpush(DEAD_LETTER_KEY, payload)
+            pipe.xack(STREAM_KEY, CONSUMER_GROUP, entry_id)
+            pipe.xdel(STREAM_KEY, entry_id)
+            await pipe.execute()
+
+    def stats(self) -> dict:
+        return {"enqueued": self.enqueued, "enqueue_errors": self.enqueue_errors}
+
+
+email_queue = EmailQueue(redis_client, claim_idle=Config.MAIL_CLAIM_IDLE)
+
+register_metrics("email_queue", email_queue.stats)
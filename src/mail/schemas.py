@@ -0,0 +1,14 @@
+import uuid
+from typing import List, Literal
+
+from pydantic import BaseModel, Field
+
+
+class EmailModel(BaseModel):
+    id: str = Field(default_factory=lambda: uuid.uuid4().hex)
+    recipients: List[str] = Field(min_length=1)
+    subject: str
+    body: str
+    subtype: Literal["plain", "html"] = "plain"
+    # Delivery attempts made so far, bumped each time the message is retried
+    attempts: int = 0
@@ -0,0 +1,328 @@
+"""
+Deliver queued email.
+
+Usage:
+    python -m src.mail.worker [--once]
+
+Reads the queue in batches and sends each batch over one SMTP connection,
+which is kept open between batches until it has been idle for
+MAIL_CONNECTION_IDLE_TIMEOUT seconds. --once sends what is queued and exits.
+
+Any SMTP server works for local runs, e.g. aiosmtpd printing what it receives:
+
+    python -m aiosmtpd -n -l localhost:1025
+    MAIL_SERVER=localhost MAIL_PORT=1025 MAIL_SSL_TLS=false \\
+        USE_CREDENTIALS=false python -m src.mail.worker --once
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import time
+from email.message import EmailMessage
+from typing import List, Optional, Tuple
+
+import aiosmtplib
+import redis.asyncio as redis
+from loguru import logger
+
+from src.config import Config
+from src.db.redis import redis_client
+from .queue import EmailQueue, email_queue
+from .schemas import EmailModel
+
+# Seconds to wait for new messages before checking retries and idle connections
+POLL_INTERVAL = 1.0
+
+
+def is_permanent_failure(error: Exception) -> bool:
+    """Whether the server rejected a message outright (5xx), so retrying cannot help."""
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        return all(refused.code >= 500 for refused in error.recipients)
+    if isinstance(error, aiosmtplib.SMTPAuthenticationError):
+        # A configuration problem, not a problem with the message
+        return False
+    if isinstance(error, aiosmtplib.SMTPResponseException):
+        return 500 <= error.code < 600
+    return False
+
+
+class MailWorker:
+    """
+    Sends queued email in batches over a reused SMTP connection.
+
+    A message the server rejects with a 5xx reply is dead-lettered. Any other
+    failure is retried with exponential backoff until `max_attempts`
+    deliveries have failed. When the connection itself fails, the rest of the
+    batch is rescheduled as well rather than tried against a server that is
+    down. Delivery is at least once: a worker that dies between sending and
+    acknowledging leaves the message to be sent again.
+
+    Args:
+        queue (EmailQueue): Queue to read from
+        sender (str): From address
+        hostname (str): SMTP server
+        port (int): SMTP port
+        username (Optional[str]): Login, or None to send unauthenticated
+        password (Optional[str]): Password for `username`
+        use_tls (bool): Connect over TLS
+        start_tls (bool): Upgrade the connection with STARTTLS
+        validate_certs (bool): Verify the server certificate
+        timeout (float): Seconds to wait on the server
+        batch_size (int): Messages read and sent per batch
+        max_attempts (int): Deliveries to try before dead-lettering
+        retry_backoff (float): Delay before the first retry, doubled each time
+        retry_backoff_max (float): Longest delay between retries
+        idle_timeout (float): Seconds an unused connection is kept open
+    """
+
+    def __init__(
+        self,
+        queue: EmailQueue,
+        sender: str,
+        hostname: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        use_tls: bool = False,
+        start_tls: bool = False,
+        validate_certs: bool = True,
+        timeout: float = 60,
+        batch_size: int = 50,
+        max_attempts: int = 5,
+        retry_backoff: float = 5.0,
+        retry_backoff_max: float = 900.0,
+        idle_timeout: float = 30.0,
+    ) -> None:
+        self.queue = queue
+        self.sender = sender
+        self.smtp_options = {
+            "hostname": hostname,
+            "port": port,
+            "username": username,
+            "password": password,
+            "use_tls": use_tls,
+            "start_tls": start_tls,
+            "validate_certs": validate_certs,
+            "timeout": timeout,
+        }
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        self.idle_timeout = idle_timeout
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+
+        self._smtp: Optional[aiosmtplib.SMTP] = None
+        self._last_used = 0.0
+        self.counters = {
+            "sent": 0,
+            "retried": 0,
+            "dead_lettered": 0,
+            "connections": 0,
+        }
+
+    # SMTP connection
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        if self._smtp is None or not self._smtp.is_connected:
+            smtp = aiosmtplib.SMTP(**self.smtp_options)
+            await smtp.connect()
+            self._smtp = smtp
+            self.counters["connections"] += 1
+        return self._smtp
+
+    async def _disconnect(self) -> None:
+        smtp, self._smtp = self._smtp, None
+        if smtp is None or not smtp.is_connected:
+            return
+        try:
+            await smtp.quit()
+        except (aiosmtplib.SMTPException, OSError):
+            smtp.close()
+
+    async def _send(self, message: EmailMessage) -> None:
+        smtp = await self._connect()
+        try:
+            await smtp.send_message(message)
+        except aiosmtplib.SMTPServerDisconnected:
+            # The server may have dropped a connection we kept open, try once more
+            self._smtp = None
+            smtp = await self._connect()
+            await smtp.send_message(message)
+        self._last_used = time.monotonic()
+
+    def build_message(self, email: EmailModel) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = ", ".join(email.recipients)
+        message["Subject"] = email.subject
+        # Stable across retries so receivers can discard duplicates
+        message["Message-ID"] = f"<{email.id}@{self.sender.rpartition('@')[2]}>"
+        message.set_content(email.body, subtype=email.subtype)
+        return message
+
+    # Delivery
+
+    def retry_delay(self, attempts: int) -> float:
+        return min(self.retry_backoff * 2 ** (attempts - 1), self.retry_backoff_max)
+
+    async def _fail(self, entry_id: str, email: EmailModel, error: Exception) -> None:
+        attempts = email.attempts + 1
+        if attempts >= self.max_attempts or is_permanent_failure(error):
+            logger.error(
+                f"Giving up on email {email.id} after {attempts} attempts: {error}"
+            )
+            await self.queue.dead_letter(entry_id, email.model_dump_json())
+            self.counters["dead_lettered"] += 1
+            return
+
+        delay = self.retry_delay(attempts)
+        logger.warning(f"Retrying email {email.id} in {delay:.0f}s: {error}")
+        await self.queue.retry(
+            entry_id, email.model_copy(update={"attempts": attempts}), delay
+        )
+        self.counters["retried"] += 1
+
+    async def send_batch(self, entries: List[Tuple[str, Optional[str]]]) -> None:
+        """Send a batch read from the queue and record the outcome of each message."""
+        delivered = []
+        for index, (entry_id, payload) in enumerate(entries):
+            try:
+                email = EmailModel.model_validate_json(payload)
+            except (TypeError, ValueError):
+                logger.error(f"Dropping malformed queue entry {entry_id}")
+                await self.queue.dead_letter(entry_id, payload or "")
+                self.counters["dead_lettered"] += 1
+                continue
+
+            try:
+                await self._send(self.build_message(email))
+            except aiosmtplib.SMTPAuthenticationError as e:
+                await self._reschedule(entries[index:], e)
+                break
+            except (
+                aiosmtplib.SMTPRecipientsRefused,
+                aiosmtplib.SMTPResponseException,
+            ) as e:
+                # The server answered, so only this message failed
+                await self._fail(entry_id, email, e)
+                continue
+            except (aiosmtplib.SMTPException, OSError, asyncio.TimeoutError) as e:
+                await self._reschedule(entries[index:], e)
+                break
+            delivered.append(entry_id)
+
+        await self.queue.ack(delivered)
+        self.counters["sent"] += len(delivered)
+
+    async def _reschedule(
+        self, entries: List[Tuple[str, Optional[str]]], error: Exception
+    ) -> None:
+        """Retry every remaining message of a batch after the connection failed."""
+        await self._disconnect()
+        logger.warning(f"SMTP connection failed, rescheduling {len(entries)} emails")
+        for entry_id, payload in entries:
+            try:
+                email = EmailModel.model_validate_json(payload)
+            except (TypeError, ValueError):
+                await self.queue.dead_letter(entry_id, payload or "")
+                self.counters["dead_lettered"] += 1
+                continue
+            await self._fail(entry_id, email, error)
+
+    async def process_batch(self, block: float = POLL_INTERVAL) -> int:
+        """
+        Promote retries that are due, then read and send one batch.
+
+        Returns:
+            int: Number of messages read
+        """
+        await self.queue.promote_due(self.batch_size)
+        entries = await self.queue.read(self.consumer, self.batch_size, block)
+        if entries:
+            await self.send_batch(entries)
+        elif (
+            self._smtp is not None
+            and time.monotonic() - self._last_used > self.idle_timeout
+        ):
+            await self._disconnect()
+        return len(entries)
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """Send email until `stop` is set."""
+        await self.queue.ensure_group()
+        logger.info(f"Mail worker {self.consumer} started")
+        try:
+            while not stop.is_set():
+                try:
+                    await self.process_batch()
+                except redis.RedisError as e:
+                    logger.error(f"Mail queue unavailable: {e}")
+                    await asyncio.sleep(POLL_INTERVAL)
+        finally:
+            await self._disconnect()
+        logger.info(f"Mail worker {self.consumer} stopped: {self.counters}")
+
+    async def drain(self) -> int:
+        """
+        Send everything that is queued, including retries already due.
+
+        Returns:
+            int: Number of messages read
+        """
+        await self.queue.ensure_group()
+        total = 0
+        try:
+            while count := await self.process_batch(block=0.01):
+                total += count
+        finally:
+            await self._disconnect()
+        return total
+
+
+def create_worker() -> MailWorker:
+    """Build a worker from the MAIL_* settings."""
+    return MailWorker(
+        email_queue,
+        sender=Config.MAIL_FROM,
+        hostname=Config.MAIL_SERVER,
+        port=Config.MAIL_PORT,
+        username=Config.MAIL_USERNAME if Config.USE_CREDENTIALS else None,
+        password=Config.MAIL_PASSWORD if Config.USE_CREDENTIALS else None,
+        use_tls=Config.MAIL_SSL_TLS,
+        start_tls=Config.MAIL_STARTTLS,
+        validate_certs=Config.VALIDATE_CERTS,
+        timeout=Config.MAIL_TIMEOUT,
+        batch_size=Config.MAIL_BATCH_SIZE,
+        max_attempts=Config.MAIL_MAX_ATTEMPTS,
+        retry_backoff=Config.MAIL_RETRY_BACKOFF,
+        retry_backoff_max=Config.MAIL_RETRY_BACKOFF_MAX,
+        idle_timeout=Config.MAIL_CONNECTION_IDLE_TIMEOUT,
+    )
+
+
+async def main(once: bool) -> None:
+    worker = create_worker()
+    try:
+        if once:
+            sent = await worker.drain()
+            logger.info(f"Processed {sent} queued emails: {worker.counters}")
+            return
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        await worker.run(stop)
+    finally:
+        await redis_client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deliver queued email")
+    parser.add_argument("--once", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.once))
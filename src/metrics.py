@@ -0,0 +1,175 @@
+import bisect
+import hmac
+import os
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from fastapi.responses import PlainTextResponse
+
+from src.config import Config
+
+# Named collectors returning a JSON-serializable snapshot of a component's counters
+_collectors: Dict[str, Callable[[], dict]] = {}
+# Histograms exposed in the Prometheus text format
+_histograms: List["Histogram"] = []
+
+# Prometheus' default latency buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+metrics_bearer = HTTPBearer(auto_error=False)
+
+
+async def verify_metrics_token(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(metrics_bearer),
+) -> None:
+    """
+    Allow only callers presenting METRICS_TOKEN. Pool, replica and blocklist
+    state is internal, so the endpoints do not exist until a token is set.
+    """
+    if not Config.METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    if credentials is None or not hmac.compare_digest(
+        credentials.credentials.encode(), Config.METRICS_TOKEN.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+metrics_router = APIRouter(dependencies=[Depends(verify_metrics_token)])
+
+
+class LatencyStats:
+    """Running count, total and maximum of a latency in seconds."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class Histogram:
+    """
+    Prometheus-style histogram with a fixed set of label names.
+
+    Args:
+        name (str): Metric name
+        documentation (str): Help text
+        labelnames (Sequence[str]): Names of the labels passed to `observe`
+        buckets (Sequence[float]): Upper bounds of the buckets, ascending
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # label values -> (per-bucket counts, sum, count)
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        series = self._series.get(labelvalues)
+        if series is None:
+            series = self._series[labelvalues] = [[0] * len(self.buckets), 0.0, 0]
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[0][index] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for labelvalues, (bucket_counts, total, count) in self._series.items():
+            labels = ",".join(
+                f'{name}="{_escape_label(value)}"'
+                for name, value in zip(self.labelnames, labelvalues)
+            )
+            prefix = f"{labels}," if labels else ""
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {count}")
+        return lines
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def register_histogram(histogram: Histogram) -> Histogram:
+    """Expose a histogram on the Prometheus metrics endpoint."""
+    _histograms.append(histogram)
+    return histogram
+
+
+def render_prometheus() -> str:
+    """Render every registered histogram in the Prometheus text format."""
+    lines = []
+    for histogram in _histograms:
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
+
+
+def register_metrics(name: str, collector: Callable[[], dict]) -> None:
+    """
+    Register a collector to be reported by the internal metrics endpoint.
+
+    Args:
+        name (str): Section name in the metrics payload
+        collector (Callable[[], dict]): Function returning the current snapshot
+    """
+    _collectors[name] = collector
+
+
+def collect_metrics() -> dict:
+    """Return a snapshot from every registered collector, tagged with the worker pid."""
+    snapshot = {"pid": os.getpid()}
+    snapshot.update({name: collector() for name, collector in _collectors.items()})
+    return snapshot
+
+
+@metrics_router.get("", include_in_schema=False)
+async def get_metrics():
+    """
+    Internal endpoint reporting per-worker metrics. Each uvicorn worker
+    answers with its own counters.
+    """
+    return collect_metrics()
+
+
+@metrics_router.get("/prometheus", include_in_schema=False)
+async def get_prometheus_metrics():
+    """
+    Internal endpoint exposing the request histograms in the Prometheus text
+    format. Like the JSON endpoint, each uvicorn worker reports only its own
+    observations.
+    """
+    return PlainTextResponse(render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
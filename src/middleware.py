@@ -1,27 +1,108 @@
-import time
 import logging
+import math
+import time
+from typing import Optional
+
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.responses import JSONResponse
 
+from src.access_log import access_log
+from src.config import Config
+from src.instrumentation import (
+    RequestTimings,
+    end_request_timings,
+    start_request_timings,
+)
+from src.auth.utils import client_identity, request_identity
+from src.ratelimit import rate_limiter
+
 
 logger = logging.getLogger("uvicorn.access")
 logger.disabled = True  # Turn to False to see FastAPI server logs
 
 
+def route_template(request: Request) -> str:
+    """Route the request matched, by template so metrics do not grow with every path."""
+    route = request.scope.get("route")
+    return route.path if route is not None else "unmatched"
+
+
+def log_access(
+    request: Request,
+    route_path: str,
+    status_code: int,
+    timings: RequestTimings,
+    total: float,
+    error: Optional[str] = None,
+) -> None:
+    client = f"{request.client.host}:{request.client.port}" if request.client else "-"
+    record = {
+        "client": client,
+        "method": request.method,
+        "path": request.url.path,
+        "route": route_path,
+        "status": status_code,
+        **timings.as_log_fields(total),
+    }
+    if error is not None:
+        record["error"] = error
+    access_log.log(record)
+
+
 def register_middleware(app: FastAPI):
 
+    if Config.RATE_LIMIT_ENABLED:
+
+        @app.middleware("http")
+        async def rate_limit(request: Request, call_next):
+            rule = rate_limiter.match(request.method, request.url.path)
+            if rule is None:
+                return await call_next(request)
+
+            if rule.by_client:
+                role, identity = client_identity(request)
+            else:
+                role, identity = await request_identity(request)
+            allowed, limit, retry_after = await rate_limiter.hit(rule, role, identity)
+            if not allowed:
+                return JSONResponse(
+                    content={
+                        "message": "Too many requests, please try again later",
+                        "error_code": "rate_limited",
+                    },
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    headers={
+                        "Retry-After": str(max(1, math.ceil(retry_after))),
+                        "X-RateLimit-Limit": str(limit),
+                    },
+                )
+            return await call_next(request)
+
     @app.middleware("http")
     async def custom_logging(request: Request, call_next):
-        start_time = time.time()
+        timings, token = start_request_timings()
+        try:
+            response = await call_next(request)
+        except Exception as e:
+            # ServerErrorMiddleware answers with a 500 once this propagates
+            total = time.perf_counter() - timings.start
+            route_path = route_template(request)
+            timings.observe(request.method, route_path, 500, total)
+            log_access(request, route_path, 500, timings, total, error=repr(e))
+            raise
+        finally:
+            end_request_timings(token)
+        total = time.perf_counter() - timings.start
 
-        response = await call_next(request)
-        processing_time = time.time() - start_time
+        route_path = route_template(request)
+        timings.observe(request.method, route_path, response.status_code, total)
 
-        message = f"{request.client.host}:{request.client.host} - {request.method} - {request.url.path} - completed after {round(processing_time, 5)}"
-        print(message)
+        if Config.SERVER_TIMING_HEADER:
+            response.headers["Server-Timing"] = timings.server_timing(total)
 
+        log_access(request, route_path, response.status_code, timings, total)
         return response
 
     # @app.middleware("http")
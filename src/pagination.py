@@ -0,0 +1,99 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+from sqlalchemy import desc, tuple_
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.errors import InvalidCursor
+
+# Default and maximum number of rows returned per page
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# Ranked results cannot use keyset pagination, so bound how deep offsets go
+MAX_SEARCH_OFFSET = 1000
+
+
+def encode_cursor(created_at: datetime, uid: uuid.UUID) -> str:
+    """
+    Encode a keyset position into an opaque, URL-safe cursor.
+
+    Args:
+        created_at (datetime): Creation timestamp of the last row on the page
+        uid (uuid.UUID): Primary key of the last row on the page
+
+    Returns:
+        str: Opaque cursor string
+    """
+    payload = json.dumps([created_at.isoformat(), str(uid)]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """
+    Decode a cursor produced by `encode_cursor`.
+
+    Args:
+        cursor (str): Opaque cursor string sent by the client
+
+    Returns:
+        Tuple[datetime, uuid.UUID]: The (created_at, uid) keyset position
+
+    Raises:
+        InvalidCursor: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, uid = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), uuid.UUID(uid)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor() from e
+
+
+async def keyset_paginate(
+    session: AsyncSession,
+    statement: Any,
+    created_at_column: Any,
+    uid_column: Any,
+    limit: int,
+    cursor: Optional[str] = None,
+) -> dict:
+    """
+    Fetch one page of `statement` ordered newest first on (created_at, uid).
+
+    The cursor is compared as a row value, so with a composite index on the
+    ordering columns each page is a bounded index range scan regardless of
+    how deep the client pages.
+
+    Args:
+        session (AsyncSession): Database session
+        statement: Select statement to paginate
+        created_at_column: Timestamp column used as the primary sort key
+        uid_column: Unique column used as the tie breaker
+        limit (int): Maximum number of rows to return
+        cursor (Optional[str]): Cursor returned by the previous page
+
+    Returns:
+        dict: `items` for the page and `next_cursor` (None on the last page)
+    """
+    if cursor:
+        created_at, uid = decode_cursor(cursor)
+        statement = statement.where(
+            tuple_(created_at_column, uid_column) < (created_at, uid)
+        )
+
+    statement = statement.order_by(desc(created_at_column), desc(uid_column)).limit(
+        limit + 1
+    )
+    result = await session.exec(statement)
+    rows = result.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.uid)
+
+    return {"items": rows, "next_cursor": next_cursor}
@@ -0,0 +1,258 @@
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Pattern, Tuple
+
+import redis.asyncio as redis
+from loguru import logger
+from starlette.routing import compile_path
+
+from src.config import Config
+from src.db.redis import redis_client
+from src.metrics import register_metrics
+
+# Limit applying to every role not listed for a route
+ANY_ROLE = "*"
+# Route key applying to every request no other rule matches
+ANY_ROUTE = "*"
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# Token bucket refilled continuously at capacity / period tokens per second.
+# Grants up to ARGV[3] tokens at once so workers can serve them locally, and
+# returns {granted, milliseconds until one token is available}.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local granted = math.min(requested, math.floor(tokens))
+tokens = tokens - granted
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+
+local retry_after = 0
+if granted == 0 then
+    retry_after = math.ceil((1 - tokens) / rate * 1000)
+end
+return {granted, retry_after}
+"""
+
+
+def parse_limit(limit: str) -> Tuple[int, int]:
+    """
+    Parse a limit such as "10/minute" into (requests, period in seconds).
+
+    Raises:
+        ValueError: If the limit is malformed
+    """
+    match = re.fullmatch(r"\s*(\d+)\s*/\s*(second|minute|hour|day)\s*", limit)
+    if match is None:
+        raise ValueError(f"Invalid rate limit {limit!r}, expected e.g. '10/minute'")
+    return int(match.group(1)), PERIODS[match.group(2)]
+
+
+class RateLimitRule:
+    """
+    Limits for one route, keyed by role.
+
+    Args:
+        route (str): "METHOD /path/{template}" or "*" for every other route
+        limits (Dict[str, str]): Limit per role, "*" for roles not listed
+        by_client (bool): Key requests by client address as anonymous
+            callers, whatever token they send
+    """
+
+    def __init__(
+        self, route: str, limits: Dict[str, str], by_client: bool = False
+    ) -> None:
+        self.route = route
+        self.by_client = by_client
+        self.method: Optional[str] = None
+        self.path_regex: Optional[Pattern] = None
+        if route != ANY_ROUTE:
+            self.method, path = route.split(" ", 1)
+            self.path_regex = compile_path(path)[0]
+        self.limits = {role: parse_limit(limit) for role, limit in limits.items()}
+
+    def matches(self, method: str, path: str) -> bool:
+        if self.path_regex is None:
+            return True
+        return method == self.method and self.path_regex.match(path) is not None
+
+    def limit_for(self, role: str) -> Optional[Tuple[int, int]]:
+        return self.limits.get(role, self.limits.get(ANY_ROLE))
+
+
+class Lease:
+    """Tokens taken from a shared bucket that this worker may spend locally."""
+
+    __slots__ = ("tokens", "expires_at", "blocked_until")
+
+    def __init__(self) -> None:
+        self.tokens = 0
+        self.expires_at = 0.0
+        self.blocked_until = 0.0
+
+
+class RateLimiter:
+    """
+    Token-bucket rate limiter shared by all workers through Redis.
+
+    Buckets live in Redis and are updated by an atomic Lua script. To keep
+    most requests off the network, a worker takes up to `lease_fraction` of a
+    bucket's capacity at once and spends those tokens locally for at most
+    `lease_ttl` seconds; once Redis reports a bucket empty, the worker also
+    rejects locally until a token is due. Leased tokens are taken from the
+    shared bucket, so the limit is never exceeded across workers; tokens left
+    in an expired lease are simply lost.
+
+    A role without a limit on the matched route is checked against the "*"
+    route's limit for that role instead. When Redis is unreachable requests
+    are allowed.
+
+    Args:
+        client (redis.Redis): Redis client
+        rules (Dict[str, Dict[str, str]]): Limits per role, keyed by route
+        client_routes (Iterable[str]): Routes limited by client address
+        lease_fraction (float): Share of a bucket's capacity leased at once
+        lease_ttl (float): Seconds a lease may be spent locally
+        max_leases (int): Leases kept per worker, least recently used evicted
+    """
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        rules: Dict[str, Dict[str, str]],
+        client_routes: Iterable[str] = (),
+        lease_fraction: float = 0.1,
+        lease_ttl: float = 1.0,
+        max_leases: int = 10000,
+        key_prefix: str = "ratelimit:",
+    ) -> None:
+        self.client = client
+        client_routes = set(client_routes)
+        self.rules: List[RateLimitRule] = [
+            RateLimitRule(route, limits, by_client=route in client_routes)
+            for route, limits in rules.items()
+            if route != ANY_ROUTE
+        ]
+        self.default_rule: Optional[RateLimitRule] = None
+        if ANY_ROUTE in rules:
+            self.default_rule = RateLimitRule(ANY_ROUTE, rules[ANY_ROUTE])
+            self.rules.append(self.default_rule)
+        self.lease_fraction = lease_fraction
+        self.lease_ttl = lease_ttl
+        self.max_leases = max_leases
+        self.key_prefix = key_prefix
+        self._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+        self._leases: "OrderedDict[str, Lease]" = OrderedDict()
+        self.allowed_local = 0
+        self.allowed_remote = 0
+        self.rejected_local = 0
+        self.rejected_remote = 0
+        self.redis_errors = 0
+
+    def match(self, method: str, path: str) -> Optional[RateLimitRule]:
+        for rule in self.rules:
+            if rule.matches(method, path):
+                return rule
+        return None
+
+    async def hit(
+        self, rule: RateLimitRule, role: str, identity: str
+    ) -> Tuple[bool, int, float]:
+        """
+        Take one token for `identity` from the rule's bucket for `role`, or
+        from the "*" route's bucket when the rule has no limit for `role`.
+
+        Returns:
+            Tuple[bool, int, float]: Whether the request is allowed, the limit
+            it was checked against and the seconds to wait before retrying
+        """
+        limit = rule.limit_for(role)
+        if limit is None and self.default_rule is not None:
+            rule = self.default_rule
+            limit = rule.limit_for(role)
+        if limit is None:
+            return True, 0, 0.0
+        capacity, period = limit
+
+        key = f"{self.key_prefix}{rule.route}:{role}:{identity}"
+        now = time.monotonic()
+        lease = self._leases.get(key)
+        if lease is None:
+            lease = self._leases[key] = Lease()
+            if len(self._leases) > self.max_leases:
+                self._leases.popitem(last=False)
+        else:
+            self._leases.move_to_end(key)
+
+        if lease.blocked_until > now:
+            self.rejected_local += 1
+            return False, capacity, lease.blocked_until - now
+        if lease.tokens > 0 and lease.expires_at > now:
+            lease.tokens -= 1
+            self.allowed_local += 1
+            return True, capacity, 0.0
+
+        lease_size = max(1, math.floor(capacity * self.lease_fraction))
+        try:
+            granted, retry_after_ms = await self._script(
+                keys=[key], args=[capacity, capacity / period, lease_size]
+            )
+        except redis.RedisError as e:
+            self.redis_errors += 1
+            logger.warning(f"Rate limiter unavailable, allowing request: {e}")
+            return True, capacity, 0.0
+
+        granted = int(granted)
+        if granted == 0:
+            retry_after = int(retry_after_ms) / 1000
+            lease.tokens = 0
+            lease.blocked_until = now + retry_after
+            self.rejected_remote += 1
+            return False, capacity, retry_after
+
+        lease.tokens = granted - 1
+        lease.expires_at = now + self.lease_ttl
+        self.allowed_remote += 1
+        return True, capacity, 0.0
+
+    def stats(self) -> dict:
+        decided = (
+            self.allowed_local
+            + self.allowed_remote
+            + self.rejected_local
+            + self.rejected_remote
+        )
+        local = self.allowed_local + self.rejected_local
+        return {
+            "rules": len(self.rules),
+            "leases": len(self._leases),
+            "allowed_local": self.allowed_local,
+            "allowed_remote": self.allowed_remote,
+            "rejected_local": self.rejected_local,
+            "rejected_remote": self.rejected_remote,
+            "local_ratio": round(local / decided, 4) if decided else 0.0,
+            "redis_errors": self.redis_errors,
+        }
+
+
+rate_limiter = RateLimiter(
+    redis_client,
+    Config.RATE_LIMITS,
+    client_routes=Config.RATE_LIMIT_CLIENT_ROUTES,
+    lease_fraction=Config.RATE_LIMIT_LEASE_FRACTION,
+    lease_ttl=Config.RATE_LIMIT_LEASE_TTL,
+)
+
+register_metrics("rate_limit", rate_limiter.stats)
@@ -0,0 +1,38 @@
+from typing import Any, Mapping, Optional
+
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+
+
+class TypedJSONResponse(Response):
+    """
+    JSON response that validates route results against a type and encodes them
+    straight to bytes with pydantic-core.
+
+    Returning it from a route skips FastAPI's response_model handling (validate,
+    dump to a dict, then `json.dumps`). Keep `response_model` on the route for
+    the OpenAPI schema and pass the matching adapter here.
+
+    Args:
+        content: Route result, e.g. ORM objects or rows of the adapter's type
+        adapter (TypeAdapter): Adapter for the response model
+        status_code (int): Response status code
+        headers (Optional[Mapping[str, str]]): Extra response headers
+    """
+
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        content: Any,
+        adapter: TypeAdapter,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> None:
+        self.adapter = adapter
+        super().__init__(content, status_code=status_code, headers=headers)
+
+    def render(self, content: Any) -> bytes:
+        return self.adapter.dump_json(
+            self.adapter.validate_python(content, from_attributes=True)
+        )
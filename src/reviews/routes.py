@@ -1,28 +1,48 @@
 from uuid import UUID
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
+from typing import Optional
 from sqlalchemy.ext.asyncio.session import AsyncSession
 
-from .schemas import ReviewCreateModel
+from .schemas import ReviewCreateModel, ReviewPageModel
 from .service import ReviewService
 
-from src.auth.dependencies import get_current_user
-from src.db.models import User
+from src.auth.dependencies import AccessTokenBearer, Rolechecker
 from src.db.postgres import get_session
+from src.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 review_router = APIRouter()
 
 review_service = ReviewService()
+access_token_bearer = AccessTokenBearer()
+role_checker = Depends(Rolechecker(["user"]))
+
+
+@review_router.get(
+    "/book/{book_uid}", response_model=ReviewPageModel, dependencies=[role_checker]
+)
+async def get_book_reviews(
+    book_uid: UUID,
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_session),
+    token_details: dict = Depends(access_token_bearer),
+):
+    reviews = await review_service.get_book_reviews(
+        book_uid, session, limit=limit, cursor=cursor
+    )
+    return reviews
 
 
 @review_router.post("/book/{book_uid}")
 async def add_review_to_book(
     book_uid: UUID,
     review_data: ReviewCreateModel,
-    current_user: User = Depends(get_current_user),
+    token_details: dict = Depends(access_token_bearer),
     session: AsyncSession = Depends(get_session),
 ):
+    # The author comes from the token, so no user row is loaded
     new_review = await review_service.add_review_to_book(
-        email=current_user.email,
+        user_uid=token_details["user"]["user_uid"],
         book_uid=book_uid,
         review_data=review_data,
         session=session,
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -18,8 +18,13 @@ class ReviewModel(BaseModel):
         from_attributes = True
 
 
+class ReviewPageModel(BaseModel):
+    items: List[ReviewModel]
+    next_cursor: Optional[str] = None
+
+
 class ReviewCreateModel(BaseModel):
-    rating: int = Field(lt=5)
+    rating: int = Field(ge=0, lt=5)
     review_text: str
 
     class Config:
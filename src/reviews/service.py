@@ -1,51 +1,75 @@
+from typing import Optional
+
 from fastapi import HTTPException, status
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio.session import AsyncSession
-
 from .schemas import ReviewCreateModel
 
 from src.db.models import Review
-from src.auth.service import UserService
 from src.books.service import BookService
+from src.books.cache import book_cache
+from src.pagination import DEFAULT_PAGE_SIZE
 
 
-user_service = UserService()
 book_service = BookService()
 
 
 class ReviewService:
+    async def get_book_reviews(
+        self,
+        book_uid: str,
+        session: AsyncSession,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ):
+        return await book_service.get_book_reviews(
+            book_uid, session, limit=limit, cursor=cursor
+        )
 
     async def add_review_to_book(
         self,
-        email: str,
+        user_uid: str,
         book_uid: str,
         review_data: ReviewCreateModel,
         session: AsyncSession,
     ):
         try:
-            book = await book_service.get_book(book_uid, session)
-            user = await user_service.get_user_by_email(email, session)
-            new_review = Review(**review_data.model_dump())
-
-            if not book:
+            # The aggregates UPDATE doubles as the check that the book exists
+            if not await book_service.record_review_rating(
+                book_uid, review_data.rating, session
+            ):
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail=f"Book with Id {book_uid} not found",
                 )
 
-            if not user:
+            # Built from RETURNING. The book was just updated, so a foreign
+            # key violation here means the author no longer exists.
+            try:
+                result = await session.execute(
+                    insert(Review)
+                    .values(
+                        **review_data.model_dump(),
+                        book_uid=book_uid,
+                        user_uid=user_uid,
+                    )
+                    .returning(Review)
+                )
+            except IntegrityError:
+                await session.rollback()
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"User with email {email} not found",
+                    detail=f"User with Id {user_uid} not found",
                 )
+            new_review = result.scalar_one()
 
-            new_review.user = user
-            new_review.book = book
-
-            session.add(new_review)
             await session.commit()
-            await session.refresh(new_review)
+            await book_cache.invalidate(book_uid)
             return new_review
 
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1,31 +1,55 @@
 from uuid import UUID
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, Request, status, Depends
+from pydantic import TypeAdapter
 from typing import List
 from sqlalchemy.ext.asyncio.session import AsyncSession
 
 from src.books.schemas import BookModel
 
-from .schemas import TagAddModel, TagModel, TagCreateModel
+from .schemas import (
+    TagAddModel,
+    TagBatchAddModel,
+    TagBatchResultModel,
+    TagCreateModel,
+    TagModel,
+)
 from .service import TagService
 
-from src.db.postgres import get_session
-from src.auth.dependencies import Rolechecker
+from src.conditional import (
+    is_not_modified,
+    make_etag,
+    not_modified_response,
+    validator_headers,
+)
+from src.db.postgres import get_read_session, get_session
+from src.responses import TypedJSONResponse
+from src.auth.dependencies import ReadRolechecker, Rolechecker
 
 tags_router = APIRouter()
 tag_service = TagService()
 role_checker = Depends(Rolechecker(["user"]))
+read_role_checker = Depends(ReadRolechecker(["user"]))
 
+TAG_LIST_ADAPTER = TypeAdapter(List[TagModel])
 
-@tags_router.get("", response_model=List[TagModel], dependencies=[role_checker])
-async def get_all_tags(session: AsyncSession = Depends(get_session)):
-    tags = await tag_service.get_all_tags(session)
+
+@tags_router.get("", response_model=List[TagModel], dependencies=[read_role_checker])
+async def get_all_tags(
+    request: Request, session: AsyncSession = Depends(get_read_session)
+):
+    last_modified, count = await tag_service.get_tags_watermark(session)
+    headers = validator_headers(make_etag("tags", last_modified, count), last_modified)
+    if is_not_modified(request, headers["ETag"], last_modified):
+        return not_modified_response(headers)
+
+    tags = await tag_service.get_tags(session)
 
     if not tags:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Error getting all tags"
         )
 
-    return tags
+    return TypedJSONResponse(tags, TAG_LIST_ADAPTER, headers=headers)
 
 
 @tags_router.post(
@@ -41,6 +65,21 @@ async def create_a_tag(
     return new_tag
 
 
+@tags_router.post(
+    "/books/tags",
+    status_code=status.HTTP_201_CREATED,
+    response_model=TagBatchResultModel,
+    dependencies=[role_checker],
+)
+async def add_tags_to_books(
+    tag_data: TagBatchAddModel,
+    session: AsyncSession = Depends(get_session),
+):
+    result = await tag_service.add_tags_to_books(tag_data, session)
+
+    return result
+
+
 @tags_router.post(
     "/books/{book_uid}/tags",
     status_code=status.HTTP_201_CREATED,
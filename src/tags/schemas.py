@@ -20,3 +20,18 @@ class TagCreateModel(BaseModel):
 
 class TagAddModel(BaseModel):
     tags: List[TagCreateModel]
+
+
+class BookTagAddModel(BaseModel):
+    book_uid: uuid.UUID
+    tags: List[TagCreateModel]
+
+
+class TagBatchAddModel(BaseModel):
+    books: List[BookTagAddModel] = Field(min_length=1)
+
+
+class TagBatchResultModel(BaseModel):
+    books: int
+    tags: List[TagModel]
+    links_added: int
@@ -1,16 +1,24 @@
-from fastapi import HTTPException, status
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import ARRAY, UUID, VARCHAR, any_, bindparam, func, literal, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio.session import AsyncSession
 from sqlmodel import select, desc
-from sqlalchemy.exc import NoResultFound
 
-from .schemas import TagAddModel, TagCreateModel
+from .schemas import TagAddModel, TagBatchAddModel, TagCreateModel
 
-from src.db.models import Tag
+from src.db.models import Book, BookTag, Tag
 from src.books.service import BookService
+from src.books.cache import book_cache
+from src.db.statements import CachedStatement
 from src.errors import BookNotFound, TagNotFound, TagAlreadyExists
 
 book_service = BookService()
 
+TAG_BY_UID = CachedStatement(select(Tag).where(Tag.uid == bindparam("tag_uid")))
+
 
 class TagService:
     async def get_tags(self, session: AsyncSession):
@@ -18,60 +26,162 @@ class TagService:
         result = await session.exec(statement)
         return result.all()
 
+    async def get_tags_watermark(
+        self, session: AsyncSession
+    ) -> Tuple[Optional[datetime], int]:
+        """Return the latest change time and the number of tags."""
+        statement = select(
+            func.max(func.coalesce(Tag.updated_at, Tag.created_at)), func.count()
+        ).select_from(Tag)
+        result = await session.exec(statement)
+        return tuple(result.one())
+
     async def create_tag(self, tag_data: TagCreateModel, session: AsyncSession):
         """Create a tag"""
 
-        statement = select(Tag).where(Tag.name == tag_data.name)
+        statement = (
+            pg_insert(Tag)
+            .values(name=tag_data.name)
+            .on_conflict_do_nothing(index_elements=[Tag.name])
+            .returning(Tag)
+        )
 
-        result = await session.exec(statement)
+        result = await session.execute(statement)
 
-        tag = result.first()
+        new_tag = result.scalar_one_or_none()
 
-        if tag:
+        if new_tag is None:
             raise TagAlreadyExists()
-        new_tag = Tag(name=tag_data.name)
-
-        session.add(new_tag)
 
         await session.commit()
 
         return new_tag
 
+    async def upsert_tags(self, names: List[str], session: AsyncSession):
+        """
+        Return the tags named `names`, creating the missing ones.
+
+        New names are inserted in one statement that skips names another
+        request created concurrently, and the rest are read back with one
+        `name = ANY(...)` query, so the cost does not grow with the number
+        of tags.
+        """
+        names = list(dict.fromkeys(names))
+        if not names:
+            return []
+
+        result = await session.execute(
+            pg_insert(Tag)
+            .on_conflict_do_nothing(index_elements=[Tag.name])
+            .returning(Tag.uid, Tag.name, Tag.created_at),
+            [{"name": name} for name in names],
+        )
+        tags = result.all()
+
+        created = {tag.name for tag in tags}
+        existing = [name for name in names if name not in created]
+        if existing:
+            result = await session.execute(
+                select(Tag.uid, Tag.name, Tag.created_at).where(
+                    Tag.name == any_(literal(existing, ARRAY(VARCHAR)))
+                )
+            )
+            tags.extend(result.all())
+
+        return tags
+
+    async def tag_books(
+        self, book_tags: Dict[uuid.UUID, List[str]], session: AsyncSession
+    ):
+        """
+        Link each book in `book_tags` to its tags, creating missing tags.
+
+        Links that already exist are skipped. The books must exist and the
+        caller commits.
+
+        Args:
+            book_tags (Dict[uuid.UUID, List[str]]): Tag names keyed by book uid
+            session (AsyncSession): Database session
+
+        Returns:
+            Tuple[list, int]: The tags involved and the number of links added
+        """
+        tags = await self.upsert_tags(
+            [name for names in book_tags.values() for name in names], session
+        )
+        tag_uids = {tag.name: tag.uid for tag in tags}
+
+        links = [
+            {"book_id": book_uid, "tag_id": tag_uids[name]}
+            for book_uid, names in book_tags.items()
+            for name in dict.fromkeys(names)
+        ]
+        added = 0
+        if links:
+            result = await session.execute(
+                pg_insert(BookTag).on_conflict_do_nothing().returning(BookTag.book_id),
+                links,
+            )
+            linked = result.scalars().all()
+            added = len(linked)
+
+            # A book's tags are part of its detail, so bump its ETag. "fetch"
+            # reads the matched uids from RETURNING and updates books already
+            # loaded in the session, so callers return a current updated_at.
+            if linked:
+                await session.execute(
+                    update(Book)
+                    .where(Book.uid == any_(literal(list(set(linked)), ARRAY(UUID))))
+                    .values(updated_at=datetime.now())
+                    .execution_options(synchronize_session="fetch")
+                )
+
+        return tags, added
+
     async def add_tags_to_book(
         self, book_uid: str, tag_data: TagAddModel, session: AsyncSession
     ):
-        try:
-            book = await book_service.get_book(book_uid=book_uid, session=session)
-
-            if not book:
-                raise BookNotFound()
-            for tag_item in tag_data.tags:
-                result = await session.exec(
-                    select(Tag).where(Tag.name == tag_item.name)
-                )
+        book = await book_service.get_book(book_uid=book_uid, session=session)
 
-                tag = result.one_or_none()
-                if not tag:
-                    tag = Tag(name=tag_item.name)
+        if not book:
+            raise BookNotFound()
 
-                book.tags.append(tag)
-            session.add(book)
-            await session.commit()
-            await session.refresh(book)
-            return book
-
-        except Exception as e:
-            print(e)
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Oops... Something went wrong!",
+        await self.tag_books(
+            {book.uid: [tag_item.name for tag_item in tag_data.tags]}, session
+        )
+        await session.commit()
+        await book_cache.invalidate(book_uid)
+        return book
+
+    async def add_tags_to_books(
+        self, tag_data: TagBatchAddModel, session: AsyncSession
+    ):
+        """Tag a batch of books, e.g. the output of a bulk import, in one call"""
+
+        book_tags = {}
+        for item in tag_data.books:
+            book_tags.setdefault(item.book_uid, []).extend(
+                tag_item.name for tag_item in item.tags
             )
 
-    async def get_tag_by_uid(self, tag_uid: str, session: AsyncSession):
+        result = await session.execute(
+            select(Book.uid).where(
+                Book.uid == any_(literal(list(book_tags), ARRAY(UUID)))
+            )
+        )
+        if len(result.all()) != len(book_tags):
+            raise BookNotFound()
 
-        statement = select(Tag).where(Tag.uid == tag_uid)
+        tags, added = await self.tag_books(book_tags, session)
+        await session.commit()
+        for book_uid in book_tags:
+            await book_cache.invalidate(book_uid)
 
-        result = await session.exec(statement)
+        return {"books": len(book_tags), "tags": tags, "links_added": added}
+
+    async def get_tag_by_uid(self, tag_uid: str, session: AsyncSession):
+
+        result = await session.exec(TAG_BY_UID.statement, params={"tag_uid": tag_uid})
 
         return result.first()
 
@@ -98,7 +208,7 @@ class TagService:
     async def delete_tag(self, tag_uid: str, session: AsyncSession):
         """Delete a tag"""
 
-        tag = self.get_tag_by_uid(tag_uid, session)
+        tag = await self.get_tag_by_uid(tag_uid, session)
 
         if not tag:
             raise TagNotFound()